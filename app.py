@@ -1,178 +1,35 @@
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv('mena_ethnicity_enhanced_final.csv')
-    
-    # UPDATE: Change "UAE" to "United Arab Emirates" for consistency
-    df['statename'] = df['statename'].replace({'UAE': 'United Arab Emirates'})
-    
-    # UPDATE: Change Berber to Amazigh as requested
-    df['group'] = df['group'].replace({'Berbers': 'Amazigh'})
-    
-    # FIX: Manual data corrections
-    # Update Mauritania from Arab-Berber to Arab-Amazigh
-    df['group'] = df['group'].replace({'Arab-Berber': 'Arab-Amazigh'})
-    
-    # FIX: Palestine data - realistic percentages
-    if 'Palestine' in df['statename'].values:
-        # Remove all existing Palestine data and replace with realistic composition
-        df = df[df['statename'] != 'Palestine']
-        palestine_data = [
-            {'statename': 'Palestine', 'group': 'Muslim Palestinian Arabs', 'percentage': 83.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Palestine', 'group': 'Jewish Israeli Settlers', 'percentage': 15.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Palestine', 'group': 'Others', 'percentage': 2.0, 'from': 2000, 'to': 2021}
-        ]
-        palestine_df = pd.DataFrame(palestine_data)
-        df = pd.concat([df, palestine_df], ignore_index=True)
-    
-    # FIX: Israel - Simplify to Jews vs Non-Jews
-    if 'Israel' in df['statename'].values:
-        df = df[df['statename'] != 'Israel']
-        israel_data = [
-            {'statename': 'Israel', 'group': 'Jews', 'percentage': 73.5, 'from': 2000, 'to': 2021},
-            {'statename': 'Israel', 'group': 'Non-Jews (Arab Muslims, Christians, Others)', 'percentage': 26.5, 'from': 2000, 'to': 2021}
-        ]
-        israel_df = pd.DataFrame(israel_data)
-        df = pd.concat([df, israel_df], ignore_index=True)
-    
-    # FIX: Tunisia composition - 98% Arab-Amazigh, 2% Others
-    if 'Tunisia' in df['statename'].values:
-        df = df[df['statename'] != 'Tunisia']
-        tunisia_data = [
-            {'statename': 'Tunisia', 'group': 'Muslim Arab-Amazigh - Sunni Muslims', 'percentage': 98.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Tunisia', 'group': 'Others', 'percentage': 2.0, 'from': 2000, 'to': 2021}
-        ]
-        tunisia_df = pd.DataFrame(tunisia_data)
-        df = pd.concat([df, tunisia_df], ignore_index=True)
-    
-    # FIX: Mauritania - Add Haratin and Sub-Saharan Africans
-    if 'Mauritania' in df['statename'].values:
-        df = df[df['statename'] != 'Mauritania']
-        mauritania_data = [
-            {'statename': 'Mauritania', 'group': 'Arab-Amazigh - Sunni Muslims', 'percentage': 30.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Mauritania', 'group': 'Haratin - Sunni Muslims', 'percentage': 40.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Mauritania', 'group': 'Sub-Saharan Africans - Sunni Muslims', 'percentage': 30.0, 'from': 2000, 'to': 2021}
-        ]
-        mauritania_df = pd.DataFrame(mauritania_data)
-        df = pd.concat([df, mauritania_df], ignore_index=True)
-    
-    # FIX: United Arab Emirates data - Focus ONLY on Emirati nationals ethnic composition
-    # Remove any existing United Arab Emirates data first
-    df = df[df['statename'] != 'United Arab Emirates']
-    
-    # United Arab Emirates Nationals Ethnic Composition 
-    # Emirati citizens have diverse ancestral backgrounds:
-    uae_nationals_data = [
-        {'statename': 'United Arab Emirates', 'group': 'Muslim Arab Tribes (Qawasim, Bani Yas, etc.) - Sunni Muslims', 'percentage': 65.0, 'from': 2000, 'to': 2021},
-        {'statename': 'United Arab Emirates', 'group': 'Muslim Persian-origin Emiratis - Sunni Muslims', 'percentage': 20.0, 'from': 2000, 'to': 2021},
-        {'statename': 'United Arab Emirates', 'group': 'Muslim Baloch-origin Emiratis - Sunni Muslims', 'percentage': 8.0, 'from': 2000, 'to': 2021},
-        {'statename': 'United Arab Emirates', 'group': 'Muslim African-origin Emiratis - Sunni Muslims', 'percentage': 5.0, 'from': 2000, 'to': 2021},
-        {'statename': 'United Arab Emirates', 'group': 'Muslim Other Emirati groups - Sunni Muslims', 'percentage': 2.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    uae_nationals_df = pd.DataFrame(uae_nationals_data)
-    df = pd.concat([df, uae_nationals_df], ignore_index=True)
-    
-    # FIX: Other Gulf Countries - Focus on CITIZEN composition only with proper labeling
-    # Remove existing Gulf country data and replace with citizen-focused data
-    gulf_countries = ['Saudi Arabia', 'Qatar', 'Kuwait', 'Oman', 'Bahrain']
-    df = df[~df['statename'].isin(gulf_countries)]
-    
-    # Saudi Arabia - Citizen composition (religious sects)
-    saudi_data = [
-        {'statename': 'Saudi Arabia', 'group': 'Arab Saudi - Sunni Muslims', 'percentage': 85.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Saudi Arabia', 'group': 'Arab Saudi - Shia Muslims', 'percentage': 15.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    # Qatar - Citizen composition (all Arab Qatari with religious diversity)
-    qatar_data = [
-        {'statename': 'Qatar', 'group': 'Arab Qatari - Sunni Muslims', 'percentage': 90.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Qatar', 'group': 'Arab Qatari - Shia Muslims', 'percentage': 10.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    # Kuwait - Citizen composition (all Arab Kuwaiti with religious diversity)
-    kuwait_data = [
-        {'statename': 'Kuwait', 'group': 'Arab Kuwaiti - Sunni Muslims', 'percentage': 70.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Kuwait', 'group': 'Arab Kuwaiti - Shia Muslims', 'percentage': 30.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    # Oman - Citizen composition (all Arab Omani with religious diversity)
-    oman_data = [
-        {'statename': 'Oman', 'group': 'Arab Omani - Ibadi Muslims', 'percentage': 75.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Oman', 'group': 'Arab Omani - Sunni Muslims', 'percentage': 15.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Oman', 'group': 'Arab Omani - Shia Muslims', 'percentage': 5.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Oman', 'group': 'Arab Omani - Hindu/Baloch', 'percentage': 5.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    # Bahrain - Citizen composition (all Arab Bahraini with religious diversity) - FIXED LABELS
-    bahrain_data = [
-        {'statename': 'Bahrain', 'group': 'Arab Bahraini - Shia Muslims', 'percentage': 65.0, 'from': 2000, 'to': 2021},
-        {'statename': 'Bahrain', 'group': 'Arab Bahraini - Sunni Muslims', 'percentage': 35.0, 'from': 2000, 'to': 2021},
-    ]
-    
-    # Add all Gulf citizen data
-    gulf_citizen_data = saudi_data + qatar_data + kuwait_data + oman_data + bahrain_data
-    gulf_citizen_df = pd.DataFrame(gulf_citizen_data)
-    df = pd.concat([df, gulf_citizen_df], ignore_index=True)
-    
-    # NEW UPDATES: Add religious designations to other countries
-    
-    # Algeria - Add Sunni Muslims
-    df.loc[(df['statename'] == 'Algeria') & (df['group'].str.contains('Arab')), 'group'] = df.loc[(df['statename'] == 'Algeria') & (df['group'].str.contains('Arab')), 'group'] + ' - Sunni Muslims'
-    df.loc[(df['statename'] == 'Algeria') & (df['group'] == 'Amazigh'), 'group'] = 'Amazigh - Sunni Muslims'
-    
-    # Morocco - Add Sunni Muslims
-    df.loc[(df['statename'] == 'Morocco') & (df['group'].str.contains('Arab')), 'group'] = df.loc[(df['statename'] == 'Morocco') & (df['group'].str.contains('Arab')), 'group'] + ' - Sunni Muslims'
-    df.loc[(df['statename'] == 'Morocco') & (df['group'] == 'Amazigh'), 'group'] = 'Amazigh - Sunni Muslims'
-    
-    # Syria - Add "Arab" to all groups except Kurds
-    df.loc[(df['statename'] == 'Syria') & (~df['group'].str.contains('Kurd')), 'group'] = 'Arab ' + df.loc[(df['statename'] == 'Syria') & (~df['group'].str.contains('Kurd')), 'group']
-    
-    # Jordan - Add "Muslims" to percentages that are not Christian Arabs
-    df.loc[(df['statename'] == 'Jordan') & (~df['group'].str.contains('Christian')), 'group'] = df.loc[(df['statename'] == 'Jordan') & (~df['group'].str.contains('Christian')), 'group'] + ' - Muslims'
-    
-    # Libya - Add "Sunni Muslims" to all ethnic groups
-    df.loc[df['statename'] == 'Libya', 'group'] = df.loc[df['statename'] == 'Libya', 'group'] + ' - Sunni Muslims'
-    
-    # Sudan - Complete overhaul
-    if 'Sudan' in df['statename'].values:
-        df = df[df['statename'] != 'Sudan']
-        sudan_data = [
-            {'statename': 'Sudan', 'group': 'Sunni Muslim Arabized Sudanese', 'percentage': 70.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Sudan', 'group': 'Beja - Sunni Muslim', 'percentage': 5.9, 'from': 2000, 'to': 2021},
-            {'statename': 'Sudan', 'group': 'Nuba - Sunni Muslim', 'percentage': 2.5, 'from': 2000, 'to': 2021},
-            {'statename': 'Sudan', 'group': 'Fur - Sunni Muslim', 'percentage': 2.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Sudan', 'group': 'Nubians - Sunni Muslim', 'percentage': 1.3, 'from': 2000, 'to': 2021},
-            {'statename': 'Sudan', 'group': 'Other Groups (Zaghawa, Fallata, Christians, Traditional)', 'percentage': 18.3, 'from': 2000, 'to': 2021}
-        ]
-        sudan_df = pd.DataFrame(sudan_data)
-        df = pd.concat([df, sudan_df], ignore_index=True)
-    
-    # Yemen - Complete overhaul
-    if 'Yemen' in df['statename'].values:
-        df = df[df['statename'] != 'Yemen']
-        yemen_data = [
-            {'statename': 'Yemen', 'group': 'Arab Sunni Islam (Shafi\'i)', 'percentage': 65.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Yemen', 'group': 'Arab Zaydi Islam', 'percentage': 34.0, 'from': 2000, 'to': 2021},
-            {'statename': 'Yemen', 'group': 'Arab Ismaili Shia Islam', 'percentage': 0.5, 'from': 2000, 'to': 2021},
-            {'statename': 'Yemen', 'group': 'Arab Twelver Shia Islam', 'percentage': 0.5, 'from': 2000, 'to': 2021}
-        ]
-        yemen_df = pd.DataFrame(yemen_data)
-        df = pd.concat([df, yemen_df], ignore_index=True)
-    
-    # FIX: Jordan - Update "Christians" to "Arab Christians"
-    df['group'] = df['group'].replace({'Christians': 'Arab Christians'})
-    
-    return df
+from datadiff import dataset_version, diff_upload
+from geometry import DEFAULT_RESOLUTION, load_boundaries
+from hierarchy import build_hierarchy, hierarchy_figure
+from pipeline import load_bundle
+from reference_data import GULF_COUNTRIES, IMPACT_COLORS, IMPACT_LEVELS
+from search import build_search_index
+from uncertainty import CONFIDENCE, DRAWS, diversity_uncertainty
+
+@st.cache_data(max_entries=1)
+def load_data(bundle_version):
+    # st.cache_data hands each session its own copy of the shared bundle's frame
+    return load_bundle().ethnicity
 
-df = load_data()
+@st.cache_data(max_entries=1)
+def load_data_version(bundle_version):
+    return dataset_version(load_bundle().ethnicity)
 
-# Streamlit app
+# Streamlit app; page config has to come before anything is drawn, including cache spinners
 st.set_page_config(page_title="MENA Ethnic and religious Diversity", layout="wide")
 
+# All sources are read and validated concurrently, once per version of the files
+bundle = load_bundle()
+df = load_data(bundle.version)
+for problem in bundle.invalid.values():
+    st.warning(f"Optional data source skipped: {problem}")
+
 st.title("🌍 MENA Ethnic and religious Diversity Dashboard")
 st.markdown("### Ethnic Composition Across Middle East & North Africa")
 
@@ -211,8 +68,7 @@ for country in all_countries:
             groups_count = len(country_data_recent)
             
             # Categorize countries
-            gulf_countries = ['United Arab Emirates', 'Saudi Arabia', 'Qatar', 'Kuwait', 'Oman', 'Bahrain']
-            if country in gulf_countries:
+            if country in GULF_COUNTRIES:
                 category = 'Gulf Citizen Population'
             elif majority_percentage > 80:
                 category = 'Highly Homogeneous'
@@ -285,8 +141,7 @@ with tab1:
         country_data_recent = country_data
         
         # Add contextual note for Gulf countries
-        gulf_countries = ['United Arab Emirates', 'Saudi Arabia', 'Qatar', 'Kuwait', 'Oman', 'Bahrain']
-        if country_for_details in gulf_countries:
+        if country_for_details in GULF_COUNTRIES:
             st.info("**Showing citizen population composition only**")
         
         # Create two columns for pie chart and stats
@@ -302,6 +157,11 @@ with tab1:
         
         with col_stats:
             st.metric("Data Year", "2021")
+            if bundle.population is not None:
+                country_population = bundle.population[bundle.population['country'] == country_for_details]
+                if not country_population.empty:
+                    latest = country_population.iloc[-1]
+                    st.metric(f"Population ({latest['year']})", f"{latest['population']:,}")
             st.metric("Total Groups", len(country_data_recent))
             majority_group = country_data_recent.loc[country_data_recent['percentage'].idxmax(), 'group']
             majority_pct = country_data_recent['percentage'].max()
@@ -317,14 +177,58 @@ with tab1:
         display_data = country_data_recent[['group', 'percentage']].sort_values('percentage', ascending=False)
         display_data['percentage'] = display_data['percentage'].round(1)
         st.dataframe(display_data, use_container_width=True, hide_index=True)
+        
+        # Ethnicity -> religion -> sect hierarchy from the precomputed tree
+        st.markdown("#### Ethnicity → Religion → Sect")
+        country_tree = build_hierarchy(df, bundle.version).countries[country_for_details]
+        
+        col_tree, col_rollup = st.columns([2, 1])
+        
+        with col_rollup:
+            hierarchy_view = st.radio("View", ["Sunburst", "Treemap"], horizontal=True, key="hierarchy_view")
+            drill_node = st.selectbox(
+                "Drill into",
+                [country_tree.root.id] + country_tree.drill_options(),
+                format_func=lambda node_id: node_id.replace(' / ', ' → '),
+                key=f"hierarchy_node_{country_for_details}"
+            )
+            node = country_tree.nodes[drill_node]
+            st.metric("Share of Population", f"{node.value:.1f}%")
+            st.metric("Groups", node.groups)
+            st.metric("Diversity Within", f"{node.diversity:.3f}")
+            if node.largest is not None:
+                st.metric("Largest Subgroup", node.largest.name, f"{node.largest.value:.1f}%")
+        
+        with col_tree:
+            fig_tree = hierarchy_figure(
+                country_tree, hierarchy_view, level=drill_node,
+                title=f"{country_for_details}: Ethnicity → Religion → Sect (2021)"
+            )
+            st.plotly_chart(fig_tree, use_container_width=True)
 
 with tab2:
     st.subheader("Ethnic Group Focus - Regional Distribution")
     
     all_ethnic_groups = sorted(df['group'].unique())
+    
+    # Fuzzy search over group and country names (handles aliases like Berber or UAE)
+    search_query = st.text_input(
+        "Search groups or countries",
+        placeholder="e.g. Amazigh, Berber, UAE, Shia, Kurds",
+        key="group_search"
+    )
+    group_options = all_ethnic_groups
+    if search_query:
+        matching_groups = build_search_index(df, bundle.version).search_groups(search_query)
+        if matching_groups:
+            group_options = matching_groups
+            st.caption(f"{len(matching_groups)} matching groups")
+        else:
+            st.warning(f"No groups or countries match '{search_query}'")
+    
     selected_ethnic_group = st.selectbox(
         "Select Ethnic Group for Analysis",
-        all_ethnic_groups,
+        group_options,
         key="ethnic_analysis"
     )
     
@@ -369,6 +273,59 @@ with tab2:
     else:
         st.warning(f"No data available for {selected_ethnic_group}")
 
+    # Offline choropleth: bundled, pre-simplified boundaries on a blank basemap (no tile or topojson fetch)
+    st.markdown("#### 🗺️ Map")
+    boundaries = load_boundaries()
+    map_col1, map_col2 = st.columns(2)
+    with map_col1:
+        map_metric = st.radio(
+            "Map shows",
+            ["Diversity Index", "Group share"],
+            horizontal=True,
+            key="map_metric"
+        )
+    with map_col2:
+        map_resolution = st.radio(
+            "Boundary detail",
+            boundaries.resolutions,
+            index=boundaries.resolutions.index(DEFAULT_RESOLUTION),
+            horizontal=True,
+            key="map_resolution"
+        )
+
+    if map_metric == "Diversity Index":
+        map_data = pd.DataFrame(country_diversity)[['country', 'diversity']].rename(columns={'diversity': 'value'})
+        map_label, map_scale, map_range = "Diversity Index", 'Viridis', (0, 1)
+    else:
+        map_data = ethnic_data[['statename', 'percentage']].rename(columns={'statename': 'country', 'percentage': 'value'})
+        map_label, map_scale, map_range = f"'{selected_ethnic_group}' share (%)", 'Blues', (0, 100)
+
+    render_start = time.perf_counter()
+    fig_map = px.choropleth_map(
+        map_data,
+        geojson=boundaries.geojson[map_resolution],  # only the selected resolution is sent
+        locations='country',
+        color='value',
+        color_continuous_scale=map_scale,
+        range_color=map_range,
+        labels={'value': map_label, 'country': 'Country'},
+        map_style="white-bg",
+        center={'lat': 25, 'lon': 20},
+        zoom=2,
+        opacity=0.8
+    )
+    fig_map.update_layout(height=500, margin=dict(t=10, l=0, r=0, b=0))
+    st.plotly_chart(fig_map, use_container_width=True)
+    render_ms = (time.perf_counter() - render_start) * 1000
+
+    st.caption(
+        f"{map_resolution} boundaries from {boundaries.source}: "
+        f"{boundaries.vertices[map_resolution]:,} vertices, "
+        f"{boundaries.payload_bytes[map_resolution] / 1024:.1f} KiB geometry sent; "
+        f"figure built and serialized in {render_ms:.0f} ms"
+        + (f". Not drawn (no boundary in source): {', '.join(boundaries.missing)}" if boundaries.missing else "")
+    )
+
 with tab3:
     st.subheader("Diversity Analysis")
     
@@ -410,6 +367,46 @@ with tab3:
             height=500
         )
         
+        # Uncertainty mode: Monte Carlo resampling of the stated compositions
+        show_uncertainty = st.checkbox(
+            "Show uncertainty bands (Monte Carlo over estimated compositions)",
+            key="uncertainty_mode"
+        )
+        if show_uncertainty:
+            uncertainty_df = diversity_uncertainty(df, load_data_version(bundle.version))
+            uncertainty_df = uncertainty_df[uncertainty_df['country'].isin(diversity_df['country'])]
+            
+            st.markdown(f"#### Diversity Index with {CONFIDENCE:.0%} Intervals ({DRAWS:,} draws)")
+            st.caption(
+                "Compositions are resampled from a Dirichlet distribution around the stated shares. "
+                "Hand-entered estimates (Gulf citizen shares, UAE, Sudan, Yemen, ...) are given wider bands than EPR data. "
+                "Rank stability is the share of draws in which a country keeps its rank."
+            )
+            
+            fig_uncertainty = px.scatter(
+                uncertainty_df,
+                x='diversity',
+                y='country',
+                error_x=uncertainty_df['ci_high'] - uncertainty_df['diversity'],
+                error_x_minus=uncertainty_df['diversity'] - uncertainty_df['ci_low'],
+                color='estimated',
+                color_discrete_map={True: '#FF7F50', False: '#45B7D1'},
+                labels={'diversity': 'Diversity Index', 'country': 'Country', 'estimated': 'Estimated Data'},
+                title="Diversity Index Uncertainty (2021)"
+            )
+            fig_uncertainty.update_layout(yaxis={'categoryorder': 'array', 'categoryarray': uncertainty_df['country'].tolist()[::-1]}, height=600)
+            st.plotly_chart(fig_uncertainty, use_container_width=True)
+            
+            uncertainty_display = pd.DataFrame({
+                'Rank': uncertainty_df['rank'],
+                'Country': uncertainty_df['country'],
+                'Diversity Index': uncertainty_df['diversity'].round(3),
+                'Interval': [f"{low:.2f} – {high:.2f}" for low, high in zip(uncertainty_df['ci_low'], uncertainty_df['ci_high'])],
+                'Rank Range': [f"{low}–{high}" if low != high else f"{low}" for low, high in zip(uncertainty_df['rank_low'], uncertainty_df['rank_high'])],
+                'Rank Stability': (uncertainty_df['rank_stability'] * 100).round(0).astype(int).astype(str) + '%',
+            })
+            st.dataframe(uncertainty_display, use_container_width=True, hide_index=True)
+        
         # Visualize diversity
         st.markdown("---")
         st.markdown("#### Diversity Index Comparison")
@@ -447,6 +444,61 @@ with tab3:
         
     else:
         st.warning("No diversity data available")
+    
+    # Dataset version diff
+    st.markdown("---")
+    with st.expander("🔄 Compare with Another Dataset Version"):
+        st.markdown(f"Current dataset version: `{load_data_version(bundle.version)}`")
+        uploaded_release = st.file_uploader(
+            "Upload an older release of the dataset (CSV)",
+            type="csv",
+            key="diff_upload"
+        )
+        apply_corrections = st.checkbox(
+            "Apply the current manual corrections to the uploaded file (uncheck for cleaned snapshots)",
+            value=True,
+            key="diff_apply_corrections"
+        )
+        
+        diff = None
+        if uploaded_release is not None:
+            # Unreadable CSVs and files not in the EPR format raise ValueError
+            try:
+                diff = diff_upload(
+                    uploaded_release.getvalue(), df, load_data_version(bundle.version), apply_corrections
+                )
+            except ValueError as error:
+                st.error(f"Can't compare '{uploaded_release.name}': {error}")
+        
+        if diff is not None:
+            st.markdown(f"`{diff.old_version}` → `{diff.new_version}`")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Added Rows", len(diff.added))
+            with col2:
+                st.metric("Removed Rows", len(diff.removed))
+            with col3:
+                st.metric("Changed Rows", len(diff.changed))
+            with col4:
+                st.metric("Countries with New Diversity Index", len(diff.diversity))
+            
+            if not diff.diversity.empty:
+                fig_diff = px.bar(
+                    diff.diversity.dropna(),
+                    x='delta',
+                    y='country',
+                    orientation='h',
+                    title="Diversity Index Change (2021)",
+                    color='delta',
+                    color_continuous_scale='RdBu'
+                )
+                st.plotly_chart(fig_diff, use_container_width=True)
+            
+            for title, frame in [("Added", diff.added), ("Removed", diff.removed), ("Changed", diff.changed)]:
+                if not frame.empty:
+                    st.markdown(f"#### {title} Rows")
+                    st.dataframe(frame, use_container_width=True, hide_index=True)
 
 with tab4:
     st.subheader("Regional Comparisons")
@@ -498,6 +550,34 @@ with tab4:
                 comparison_df = pd.DataFrame(comparison_metrics)
                 comparison_df = comparison_df.sort_values('Diversity Index', ascending=False)
                 st.dataframe(comparison_df, use_container_width=True, hide_index=True)
+    
+    # Regional hierarchy rollups
+    st.markdown("---")
+    st.markdown("### Regional Ethnicity → Religion → Sect Breakdown")
+    st.caption("Unweighted average across countries: each country counts equally, as the dataset has no population totals.")
+    region_tree = build_hierarchy(df, bundle.version).region
+    
+    col_tree, col_rollup = st.columns([2, 1])
+    
+    with col_rollup:
+        rollup_level = st.selectbox("Roll up by", ['ethnicity', 'religion', 'sect'], format_func=str.title, key="rollup_level")
+        rollup_df = pd.DataFrame(list(region_tree.level_totals[rollup_level].items()), columns=[rollup_level.title(), 'Average Share %'])
+        rollup_df['Average Share %'] = rollup_df['Average Share %'].round(2)
+        st.dataframe(rollup_df, use_container_width=True, hide_index=True)
+        
+        region_node = st.selectbox(
+            "Drill into",
+            [region_tree.root.id] + region_tree.drill_options(),
+            format_func=lambda node_id: node_id.replace(' / ', ' → '),
+            key="region_hierarchy_node"
+        )
+        node = region_tree.nodes[region_node]
+        st.metric("Average Share", f"{node.value:.2f}%")
+        st.metric("Diversity Within", f"{node.diversity:.3f}")
+    
+    with col_tree:
+        fig_region_tree = hierarchy_figure(region_tree, 'Sunburst', level=region_node, title="MENA: Ethnicity → Religion → Sect → Country (2021)")
+        st.plotly_chart(fig_region_tree, use_container_width=True)
 
 with tab5:
     st.header("⚔️ Conflict & Migration Patterns (1967-Present)")
@@ -509,162 +589,19 @@ with tab5:
     and displacements caused by decades of conflict.
     """)
 
-    # Enhanced conflict data with detailed casualty information including North African conflicts
-    conflicts_data = [
-        # Israeli-Palestinian conflicts since 1967 with detailed casualty data
-        {
-            'year': 1967, 'name': 'Six-Day War', 'duration': 6, 'impact': 'Very High', 
-            'countries': ['Israel', 'Palestine', 'Egypt', 'Syria', 'Jordan'], 
-            'displaced': 300000, 'type': 'Interstate War',
-            'casualties': '~20,000 total', 'description': 'Israel captures West Bank, Gaza, Golan Heights, Sinai'
-        },
-        {
-            'year': 1973, 'name': 'Yom Kippur War', 'duration': 19, 'impact': 'Very High', 
-            'countries': ['Israel', 'Egypt', 'Syria'], 
-            'displaced': 100000, 'type': 'Interstate War',
-            'casualties': '~15,000 total', 'description': 'Egypt and Syria launch surprise attack on Israel'
-        },
-        {
-            'year': 1982, 'name': 'First Lebanon War', 'duration': 105, 'impact': 'Very High', 
-            'countries': ['Israel', 'Lebanon', 'Syria'], 
-            'displaced': 600000, 'type': 'Interstate War',
-            'casualties': '~20,000 total', 'description': 'Israel invades Lebanon to remove PLO'
-        },
-        {
-            'year': 1987, 'name': 'First Intifada', 'duration': 1825, 'impact': 'High', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 150000, 'type': 'Uprising',
-            'casualties': '~2,000 total', 'description': 'Palestinian uprising against Israeli occupation'
-        },
-        {
-            'year': 2000, 'name': 'Second Intifada', 'duration': 1825, 'impact': 'Very High', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 350000, 'type': 'Uprising',
-            'casualties': '~4,000 total', 'description': 'Violent Palestinian uprising following failed peace talks'
-        },
-        {
-            'year': 2006, 'name': 'Second Lebanon War', 'duration': 34, 'impact': 'High', 
-            'countries': ['Israel', 'Lebanon'], 
-            'displaced': 1000000, 'type': 'Interstate War',
-            'casualties': '~1,500 total', 'description': 'Hezbollah cross-border raid triggers war with Israel'
-        },
-        {
-            'year': 2008, 'name': 'Gaza War (Cast Lead)', 'duration': 22, 'impact': 'High', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 150000, 'type': 'Military Operation',
-            'casualties': '~1,400 total', 'description': 'Israeli operation against Hamas in Gaza'
-        },
-        {
-            'year': 2012, 'name': 'Operation Pillar of Defense', 'duration': 8, 'impact': 'Medium', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 75000, 'type': 'Military Operation',
-            'casualties': '~170 total', 'description': 'Israeli operation against Hamas military targets'
-        },
-        {
-            'year': 2014, 'name': 'Gaza War (Protective Edge)', 'duration': 50, 'impact': 'Very High', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 500000, 'type': 'Military Operation',
-            'casualties': '~2,200 total', 'description': 'Major conflict following Hamas rocket attacks'
-        },
-        {
-            'year': 2021, 'name': 'Gaza Conflict (May 2021)', 'duration': 11, 'impact': 'High', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 75000, 'type': 'Military Operation',
-            'casualties': '~260 total', 'description': 'Conflict sparked by tensions in Jerusalem'
-        },
-        {
-            'year': 2023, 'name': 'Israel-Hamas War (2023-2025)', 'duration': 800, 'impact': 'Catastrophic', 
-            'countries': ['Israel', 'Palestine'], 
-            'displaced': 1900000, 'type': 'War',
-            'casualties': '85,530+ total', 'description': 'Ongoing war following Hamas October 7 attacks'
-        },
-        
-        # North African conflicts
-        {
-            'year': 1975, 'name': 'Western Sahara War', 'duration': 3650, 'impact': 'High', 
-            'countries': ['Morocco', 'Western Sahara'], 
-            'displaced': 200000, 'type': 'Territorial Conflict',
-            'casualties': '~15,000 total', 'description': 'Ongoing conflict between Morocco and Polisario Front'
-        },
-        {
-            'year': 1991, 'name': 'Algerian Civil War', 'duration': 2920, 'impact': 'Very High', 
-            'countries': ['Algeria'], 
-            'displaced': 1000000, 'type': 'Civil War',
-            'casualties': '~200,000 total', 'description': 'Conflict between government and Islamist groups'
-        },
-        {
-            'year': 2011, 'name': 'Libyan Civil War', 'duration': 365, 'impact': 'High', 
-            'countries': ['Libya'], 
-            'displaced': 500000, 'type': 'Civil War',
-            'casualties': '~25,000 total', 'description': 'Overthrow of Gaddafi regime'
-        },
-        {
-            'year': 2012, 'name': 'Northern Mali Conflict', 'duration': 2920, 'impact': 'High', 
-            'countries': ['Mali'], 
-            'displaced': 500000, 'type': 'Insurgency',
-            'casualties': '~10,000 total', 'description': 'Tuareg rebellion and Islamist insurgency'
-        },
-        
-        # Other regional conflicts
-        {
-            'year': 1975, 'name': 'Lebanese Civil War', 'duration': 5475, 'impact': 'Very High', 
-            'countries': ['Lebanon'], 
-            'displaced': 900000, 'type': 'Civil War',
-            'casualties': '~150,000 total', 'description': 'Sectarian conflict with regional involvement'
-        },
-        {
-            'year': 1980, 'name': 'Iran-Iraq War', 'duration': 2887, 'impact': 'Very High', 
-            'countries': ['Iran', 'Iraq'], 
-            'displaced': 2500000, 'type': 'Interstate War',
-            'casualties': '~1,000,000 total', 'description': 'Longest conventional war of 20th century'
-        },
-        {
-            'year': 1990, 'name': 'Gulf War', 'duration': 43, 'impact': 'High', 
-            'countries': ['Iraq', 'Kuwait', 'Saudi Arabia'], 
-            'displaced': 5000000, 'type': 'Interstate War',
-            'casualties': '~50,000 total', 'description': 'Coalition forces liberate Kuwait from Iraq'
-        },
-        {
-            'year': 2003, 'name': 'Iraq War', 'duration': 3180, 'impact': 'Very High', 
-            'countries': ['Iraq'], 
-            'displaced': 9200000, 'type': 'Interstate War',
-            'casualties': '~300,000 total', 'description': 'US-led invasion and subsequent insurgency'
-        },
-        {
-            'year': 2011, 'name': 'Syrian Civil War', 'duration': 4800, 'impact': 'Very High', 
-            'countries': ['Syria'], 
-            'displaced': 13000000, 'type': 'Civil War',
-            'casualties': '~600,000 total', 'description': 'Ongoing multi-sided civil war'
-        },
-        {
-            'year': 2014, 'name': 'Yemeni Civil War', 'duration': 3285, 'impact': 'Very High', 
-            'countries': ['Yemen'], 
-            'displaced': 4000000, 'type': 'Civil War',
-            'casualties': '~377,000 total', 'description': 'Civil war with Saudi-led intervention'
-        }
-    ]
-    
-    conflicts_df = pd.DataFrame(conflicts_data)
+    conflicts_df = bundle.conflicts
+    conflict_records = bundle.conflict_records
     
     # Create an interactive timeline with enhanced visualization
     st.subheader("📅 Major Conflicts Timeline (1967-Present)")
     
-    # Color mapping for impact levels
-    impact_colors = {
-        'Catastrophic': '#8B0000',
-        'Very High': '#FF0000', 
-        'High': '#FF4500',
-        'Medium': '#FFA500',
-        'Low': '#FFD700'
-    }
-    
     # Create a bubble chart timeline
     fig_timeline = px.scatter(conflicts_df, 
                              x='year', 
                              y='impact',
                              size='displaced',
                              color='impact',
-                             color_discrete_map=impact_colors,
+                             color_discrete_map=IMPACT_COLORS,
                              hover_name='name',
                              hover_data={
                                  'duration': True, 
@@ -678,7 +615,7 @@ with tab5:
                              labels={'impact': 'Conflict Impact', 'year': 'Year'})
     
     fig_timeline.update_layout(
-        yaxis={'categoryorder': 'array', 'categoryarray': ['Low', 'Medium', 'High', 'Very High', 'Catastrophic']},
+        yaxis={'categoryorder': 'array', 'categoryarray': list(IMPACT_LEVELS)},
         xaxis={'title': 'Year', 'tickvals': list(range(1965, 2030, 5))},
         height=500,
         showlegend=False
@@ -712,13 +649,13 @@ with tab5:
     
     selected_conflict = st.selectbox(
         "Select conflict for detailed analysis:",
-        sorted([f"{c['year']}: {c['name']}" for c in conflicts_data], reverse=True),
+        sorted([f"{c['year']}: {c['name']}" for c in conflict_records], reverse=True),
         key="conflict_selector"
     )
     
     # Find the selected conflict
     selected_year = int(selected_conflict.split(":")[0])
-    selected_conflict_data = next((c for c in conflicts_data if c['year'] == selected_year), None)
+    selected_conflict_data = next((c for c in conflict_records if c['year'] == selected_year), None)
     
     if selected_conflict_data:
         col1, col2 = st.columns([2, 1])
@@ -740,7 +677,7 @@ with tab5:
     # Calculate conflicts per decade
     decades = []
     for year in range(1960, 2030, 10):
-        decade_conflicts = [c for c in conflicts_data if year <= c['year'] < year + 10]
+        decade_conflicts = [c for c in conflict_records if year <= c['year'] < year + 10]
         decades.append({
             'Decade': f"{year}s",
             'Conflicts': len(decade_conflicts),
@@ -762,7 +699,7 @@ with tab5:
     # Israeli-Palestinian conflict focus
     st.subheader("🇮🇱🇵🇸 Israeli-Palestinian Conflict Analysis")
     
-    ip_conflicts = [c for c in conflicts_data if 'Israel' in c['countries'] and 'Palestine' in c['countries']]
+    ip_conflicts = [c for c in conflict_records if 'Israel' in c['countries'] and 'Palestine' in c['countries']]
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -784,17 +721,7 @@ with tab5:
     # Ethnic Migration Patterns - FIXED VERSION
     st.subheader("🚶‍♂️ Major Ethnic Displacement Patterns")
     
-    migration_data = [
-        {'group': 'Palestinians', 'period': '1948-present', 'scale': 6500000, 'scale_label': '6.5M+', 'primary_destinations': ['Jordan', 'Lebanon', 'Syria', 'Gulf States']},
-        {'group': 'Syrians', 'period': '2011-present', 'scale': 6800000, 'scale_label': '6.8M', 'primary_destinations': ['Turkey', 'Lebanon', 'Jordan', 'Europe']},
-        {'group': 'Iraqis', 'period': '2003-present', 'scale': 9200000, 'scale_label': '9.2M', 'primary_destinations': ['Syria', 'Jordan', 'Iran', 'Europe']},
-        {'group': 'Yemenis', 'period': '2014-present', 'scale': 4000000, 'scale_label': '4M', 'primary_destinations': ['Oman', 'Saudi Arabia', 'Djibouti']},
-        {'group': 'Kurds', 'period': 'Various', 'scale': 3000000, 'scale_label': '3M+', 'primary_destinations': ['Turkey', 'Iraq', 'Syria', 'Iran', 'Europe']},
-        {'group': 'Saharawis', 'period': '1975-present', 'scale': 200000, 'scale_label': '200K', 'primary_destinations': ['Algeria', 'Mauritania', 'Spain']},
-        {'group': 'Libyans', 'period': '2011-present', 'scale': 500000, 'scale_label': '500K', 'primary_destinations': ['Tunisia', 'Egypt', 'Europe']}
-    ]
-    
-    migration_df = pd.DataFrame(migration_data)
+    migration_df, migration_display_df = bundle.migrations, bundle.migration_display
     
     # Use bar chart instead of treemap for better compatibility
     fig_migration = px.bar(migration_df.sort_values('scale', ascending=True),
@@ -816,15 +743,6 @@ with tab5:
     
     # Display migration data as table
     st.markdown("#### Detailed Migration Patterns")
-    migration_display_df = migration_df[['group', 'period', 'scale_label', 'primary_destinations']].copy()
-    migration_display_df['primary_destinations'] = migration_display_df['primary_destinations'].apply(lambda x: ', '.join(x))
-    migration_display_df = migration_display_df.rename(columns={
-        'group': 'Ethnic Group',
-        'period': 'Period',
-        'scale_label': 'Estimated Displaced',
-        'primary_destinations': 'Primary Destinations'
-    })
-    
     st.dataframe(migration_display_df, use_container_width=True, hide_index=True)
     
     # Methodology note
@@ -837,3 +755,4 @@ with tab5:
 # CLEAN FOOTER
 st.markdown("---")
 st.markdown("**Data Sources**: EPR Core 2021 + Estimates | Gulf citizen data based on demographic studies")
+st.caption(f"Data bundle `{bundle.version}` · {len(bundle.timings)} sources loaded in {bundle.load_seconds * 1000:.0f} ms")
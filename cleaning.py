@@ -0,0 +1,76 @@
+"""Manual corrections applied to the raw EPR extract before display."""
+import pandas as pd
+
+from reference_data import COUNTRY_OVERRIDES, OVERRIDE_FROM, OVERRIDE_TO
+
+DATA_PATH = 'mena_ethnicity_enhanced_final.csv'
+
+
+def override_frame(countries):
+    # Build the manually corrected rows for the given countries from COUNTRY_OVERRIDES
+    return pd.DataFrame([
+        {'statename': country, 'group': group, 'percentage': percentage, 'from': OVERRIDE_FROM, 'to': OVERRIDE_TO}
+        for country in countries
+        for group, percentage in COUNTRY_OVERRIDES[country]
+    ])
+
+
+def clean_data(df):
+    # Apply the manual corrections and relabelling to a raw EPR-format frame
+    df = df.copy()
+    
+    # UPDATE: Change "UAE" to "United Arab Emirates" for consistency
+    df['statename'] = df['statename'].replace({'UAE': 'United Arab Emirates'})
+    
+    # UPDATE: Change Berber to Amazigh as requested
+    df['group'] = df['group'].replace({'Berbers': 'Amazigh'})
+    
+    # FIX: Manual data corrections
+    # Update Mauritania from Arab-Berber to Arab-Amazigh
+    df['group'] = df['group'].replace({'Arab-Berber': 'Arab-Amazigh'})
+    
+    # FIX: Palestine, Israel, Tunisia and Mauritania - replace with corrected compositions
+    for country in ['Palestine', 'Israel', 'Tunisia', 'Mauritania']:
+        if country in df['statename'].values:
+            df = df[df['statename'] != country]
+            df = pd.concat([df, override_frame([country])], ignore_index=True)
+    
+    # FIX: United Arab Emirates data - Focus ONLY on Emirati nationals ethnic composition
+    df = df[df['statename'] != 'United Arab Emirates']
+    df = pd.concat([df, override_frame(['United Arab Emirates'])], ignore_index=True)
+    
+    # FIX: Other Gulf Countries - Focus on CITIZEN composition only with proper labeling
+    # Remove existing Gulf country data and replace with citizen-focused data
+    gulf_countries = ['Saudi Arabia', 'Qatar', 'Kuwait', 'Oman', 'Bahrain']
+    df = df[~df['statename'].isin(gulf_countries)]
+    df = pd.concat([df, override_frame(gulf_countries)], ignore_index=True)
+    
+    # NEW UPDATES: Add religious designations to other countries
+    
+    # Algeria - Add Sunni Muslims
+    df.loc[(df['statename'] == 'Algeria') & (df['group'].str.contains('Arab')), 'group'] = df.loc[(df['statename'] == 'Algeria') & (df['group'].str.contains('Arab')), 'group'] + ' - Sunni Muslims'
+    df.loc[(df['statename'] == 'Algeria') & (df['group'] == 'Amazigh'), 'group'] = 'Amazigh - Sunni Muslims'
+    
+    # Morocco - Add Sunni Muslims
+    df.loc[(df['statename'] == 'Morocco') & (df['group'].str.contains('Arab')), 'group'] = df.loc[(df['statename'] == 'Morocco') & (df['group'].str.contains('Arab')), 'group'] + ' - Sunni Muslims'
+    df.loc[(df['statename'] == 'Morocco') & (df['group'] == 'Amazigh'), 'group'] = 'Amazigh - Sunni Muslims'
+    
+    # Syria - Add "Arab" to all groups except Kurds
+    df.loc[(df['statename'] == 'Syria') & (~df['group'].str.contains('Kurd')), 'group'] = 'Arab ' + df.loc[(df['statename'] == 'Syria') & (~df['group'].str.contains('Kurd')), 'group']
+    
+    # Jordan - Add "Muslims" to percentages that are not Christian Arabs
+    df.loc[(df['statename'] == 'Jordan') & (~df['group'].str.contains('Christian')), 'group'] = df.loc[(df['statename'] == 'Jordan') & (~df['group'].str.contains('Christian')), 'group'] + ' - Muslims'
+    
+    # Libya - Add "Sunni Muslims" to all ethnic groups
+    df.loc[df['statename'] == 'Libya', 'group'] = df.loc[df['statename'] == 'Libya', 'group'] + ' - Sunni Muslims'
+    
+    # Sudan and Yemen - Complete overhaul
+    for country in ['Sudan', 'Yemen']:
+        if country in df['statename'].values:
+            df = df[df['statename'] != country]
+            df = pd.concat([df, override_frame([country])], ignore_index=True)
+    
+    # FIX: Jordan - Update "Christians" to "Arab Christians"
+    df['group'] = df['group'].replace({'Christians': 'Arab Christians'})
+    
+    return df
@@ -0,0 +1,182 @@
+"""Diff two versions of the ethnicity dataset.
+
+Rows are identified by (country, period, group) and hashed with
+pandas' vectorized hashing, so a diff is one hash join over the two
+releases and stays linear in the number of rows.
+
+Usage:
+    python datadiff.py old.csv new.csv             # raw EPR extracts; current corrections applied to both
+    python datadiff.py old.csv new.csv --cleaned   # snapshots already written with --snapshot
+    python datadiff.py --snapshot snapshot.csv     # write the cleaned data the app currently shows
+"""
+import argparse
+import io
+import json
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cleaning import DATA_PATH, clean_data
+
+KEY_COLUMNS = ['statename', 'from', 'to', 'group']
+VALUE_COLUMNS = ['percentage', 'size']
+
+DataDiff = namedtuple('DataDiff', ['old_version', 'new_version', 'added', 'removed', 'changed', 'diversity'])
+
+
+def release_problems(df):
+    # Reasons a frame can't be diffed as an EPR-format release; empty if it can
+    missing = [column for column in KEY_COLUMNS + ['percentage'] if column not in df.columns]
+    if missing:
+        return [f"missing columns: {', '.join(missing)}"]
+    problems = []
+    blank = df[KEY_COLUMNS].isna().any(axis=1)
+    if blank.any():
+        problems.append(f"{blank.sum()} rows with a blank {'/'.join(KEY_COLUMNS)}")
+    for column in ['from', 'to', 'percentage']:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            problems.append(f"non-numeric values in '{column}'")
+    for column in ['statename', 'group']:
+        if pd.api.types.is_numeric_dtype(df[column]):
+            problems.append(f"numbers instead of names in '{column}'")
+    return problems
+
+
+def _hash_columns(df, columns):
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def row_hashes(df):
+    # One row per (country, period, group) with a key hash and a value hash;
+    # repeated keys are numbered so they still line up one-to-one
+    # Normalize dtypes first so e.g. int vs float periods from different CSVs hash alike
+    rows = df[KEY_COLUMNS].astype({'statename': str, 'group': str, 'from': 'float64', 'to': 'float64'})
+    rows['occurrence'] = rows.groupby(KEY_COLUMNS, sort=False).cumcount()
+    rows['percentage'] = df['percentage'].to_numpy()
+    rows['key_hash'] = _hash_columns(rows, KEY_COLUMNS + ['occurrence'])
+    rows['value_hash'] = _hash_columns(df.reindex(columns=VALUE_COLUMNS).astype('float64'), VALUE_COLUMNS)
+    return rows
+
+
+def dataset_version(df, rows=None):
+    # Order-independent fingerprint of the whole dataset (wrapping uint64 sum of row hashes);
+    # pass rows when row_hashes(df) has already been computed
+    if rows is None:
+        rows = row_hashes(df)
+    combined = rows['key_hash'].to_numpy() * np.uint64(31) + rows['value_hash'].to_numpy()
+    return f"{int(combined.sum(dtype=np.uint64)):016x}"
+
+
+def diversity_by_country(df, year=2021):
+    # Same index as the app: 1 - sum(share^2) over the groups of the given year
+    shares = df.loc[df['to'] == year, ['statename', 'percentage']]
+    squares = (shares['percentage'] / 100) ** 2
+    return 1 - squares.groupby(shares['statename']).sum()
+
+
+def diff_versions(old_df, new_df):
+    old_rows = row_hashes(old_df)
+    new_rows = row_hashes(new_df)
+
+    merged = old_rows.merge(new_rows, on='key_hash', how='outer', suffixes=('_old', '_new'), indicator=True)
+
+    def side(frame, suffix):
+        columns = {f"{c}{suffix}": c for c in KEY_COLUMNS}
+        return frame[list(columns)].rename(columns=columns).astype({'from': 'int64', 'to': 'int64'})
+
+    added = merged[merged['_merge'] == 'right_only']
+    added = side(added, '_new').assign(percentage=added['percentage_new'].to_numpy())
+
+    removed = merged[merged['_merge'] == 'left_only']
+    removed = side(removed, '_old').assign(percentage=removed['percentage_old'].to_numpy())
+
+    changed = merged[(merged['_merge'] == 'both') & (merged['value_hash_old'] != merged['value_hash_new'])]
+    changed = side(changed, '_new').assign(
+        old_percentage=changed['percentage_old'].to_numpy(),
+        new_percentage=changed['percentage_new'].to_numpy(),
+    )
+
+    diversity = pd.DataFrame({
+        'old_diversity': diversity_by_country(old_df),
+        'new_diversity': diversity_by_country(new_df),
+    })
+    diversity['delta'] = diversity['new_diversity'] - diversity['old_diversity']
+    diversity = diversity[diversity['delta'].fillna(1) != 0]
+    diversity = diversity.sort_values('delta', key=lambda d: d.abs(), ascending=False, na_position='first')
+    diversity = diversity.rename_axis('country').reset_index()
+
+    return DataDiff(
+        old_version=dataset_version(old_df, old_rows),
+        new_version=dataset_version(new_df, new_rows),
+        added=added.sort_values(KEY_COLUMNS).reset_index(drop=True),
+        removed=removed.sort_values(KEY_COLUMNS).reset_index(drop=True),
+        changed=changed.sort_values(KEY_COLUMNS).reset_index(drop=True),
+        diversity=diversity,
+    )
+
+
+@st.cache_data(max_entries=4)
+def diff_upload(csv_bytes, _current_df, data_version, apply_cleaning=True):
+    # Diff an uploaded (older) release against the data currently shown; cached per data
+    # version (the current frame itself is not hashed), keeping only the last few uploads
+    old_df = pd.read_csv(io.BytesIO(csv_bytes))
+    problems = release_problems(old_df)
+    if problems:
+        raise ValueError('; '.join(problems))
+    if apply_cleaning:
+        old_df = clean_data(old_df)
+    return diff_versions(old_df, _current_df)
+
+
+def print_diff(diff):
+    print(f"Old version: {diff.old_version}")
+    print(f"New version: {diff.new_version}")
+    print(f"Added rows: {len(diff.added)}, removed rows: {len(diff.removed)}, changed rows: {len(diff.changed)}")
+    for title, frame in [('Added', diff.added), ('Removed', diff.removed), ('Changed', diff.changed),
+                         ('Diversity index changes (2021)', diff.diversity)]:
+        if not frame.empty:
+            print(f"\n{title}:")
+            print(frame.to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two versions of the MENA ethnicity dataset")
+    parser.add_argument('old', nargs='?', help="older CSV")
+    parser.add_argument('new', nargs='?', help="newer CSV")
+    parser.add_argument('--cleaned', action='store_true',
+                        help="inputs are cleaned snapshots; don't apply the current corrections")
+    parser.add_argument('--snapshot', metavar='FILE', help="write the cleaned current dataset to FILE and exit")
+    parser.add_argument('--json', action='store_true', help="print the diff as JSON")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        clean_data(pd.read_csv(DATA_PATH)).to_csv(args.snapshot, index=False)
+        print(f"Snapshot written to {args.snapshot}")
+        return 0
+    if not (args.old and args.new):
+        parser.error("old and new CSV files are required")
+
+    frames = [pd.read_csv(path) for path in (args.old, args.new)]
+    for path, frame in zip((args.old, args.new), frames):
+        problems = release_problems(frame)
+        if problems:
+            parser.error(f"{path}: {'; '.join(problems)}")
+    if not args.cleaned:
+        frames = [clean_data(frame) for frame in frames]
+    diff = diff_versions(*frames)
+
+    if args.json:
+        print(json.dumps({
+            field: value if isinstance(value, str) else json.loads(value.to_json(orient='records'))
+            for field, value in diff._asdict().items()
+        }, indent=2))
+    else:
+        print_diff(diff)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Bundled MENA boundary geometry for the offline choropleth.
+
+The boundaries are prepared once, offline, by ``python geometry.py build``:
+each country outline is simplified (Douglas-Peucker) and snapped to a
+coordinate grid at several tolerances, and every resolution is written to
+mena_boundaries.json as a ready-made GeoJSON FeatureCollection. The app loads
+that file once per process and hands only the selected resolution to the map,
+so the browser never downloads more geometry than it draws and nothing is
+fetched from the network.
+
+Usage:
+    python geometry.py build naturalearth_lowres.shp   # rebuild mena_boundaries.json (needs pyshp)
+    python geometry.py stats                           # payload size per resolution
+"""
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+import streamlit as st
+
+GEOMETRY_PATH = Path(__file__).resolve().parent / 'mena_boundaries.json'
+
+SOURCE = 'Natural Earth 1:110m Admin 0 countries (public domain)'
+
+# name -> (simplification tolerance in degrees, grid step in degrees); detailed first
+RESOLUTIONS = {
+    'Detailed': (0.0, 0.001),
+    'Medium': (0.05, 0.01),
+    'Coarse': (0.2, 0.05),
+}
+DEFAULT_RESOLUTION = 'Medium'
+
+
+def _segment_distance(point, start, end):
+    # Distance from point to the segment start-end (planar, in degrees)
+    (px, py), (ax, ay), (bx, by) = point, start, end
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker: keep the points that deviate more than ``tolerance``."""
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        best, best_index = 0.0, None
+        for i in range(first + 1, last):
+            distance = _segment_distance(points[i], points[first], points[last])
+            if distance > best:
+                best, best_index = distance, i
+        if best_index is not None and best > tolerance:
+            keep[best_index] = True
+            stack.append((first, best_index))
+            stack.append((best_index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_ring(ring, tolerance, step):
+    """Simplify and quantize a closed ring; None if it collapses below a triangle."""
+    # Split the ring at its farthest point from the start so both halves are open lines
+    start = ring[0]
+    far = max(range(len(ring)), key=lambda i: math.hypot(ring[i][0] - start[0], ring[i][1] - start[1]))
+    simplified = simplify_line(ring[:far + 1], tolerance)[:-1] + simplify_line(ring[far:], tolerance)
+
+    decimals = max(0, -math.floor(math.log10(step)))
+    snapped = []
+    for x, y in simplified:
+        point = [round(round(x / step) * step, decimals), round(round(y / step) * step, decimals)]
+        if not snapped or point != snapped[-1]:
+            snapped.append(point)
+    if snapped[0] != snapped[-1]:
+        snapped.append(snapped[0])
+    return snapped if len(snapped) >= 4 else None
+
+
+def simplify_polygons(polygons, tolerance, step):
+    # polygons: list of polygons, each a list of rings (outer ring first)
+    result = []
+    for rings in polygons:
+        outer = simplify_ring(rings[0], tolerance, step)
+        if outer is None:
+            continue  # islands smaller than the tolerance disappear
+        holes = [hole for hole in (simplify_ring(r, tolerance, step) for r in rings[1:]) if hole]
+        result.append([outer] + holes)
+    if not result and polygons:
+        # Never drop a whole country: keep its largest outline at the finest grid
+        largest = max(polygons, key=lambda rings: len(rings[0]))
+        result.append([simplify_ring(largest[0], 0.0, step)])
+    return result
+
+
+def feature_collection(countries, tolerance, step):
+    features = []
+    for name, polygons in sorted(countries.items()):
+        parts = simplify_polygons(polygons, tolerance, step)
+        geometry = (
+            {'type': 'Polygon', 'coordinates': parts[0]} if len(parts) == 1
+            else {'type': 'MultiPolygon', 'coordinates': parts}
+        )
+        features.append({'type': 'Feature', 'id': name, 'properties': {'name': name}, 'geometry': geometry})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def read_shapefile(path, names):
+    # Country outlines from a Natural Earth admin-0 shapefile, as {name: [[ring, ...], ...]}
+    import shapefile  # pyshp; only needed to rebuild the bundled file
+
+    countries = {}
+    with shapefile.Reader(str(path)) as reader:
+        name_field = 'name' if 'name' in [field[0] for field in reader.fields] else 'NAME'
+        for shape_record in reader.iterShapeRecords():
+            name = shape_record.record[name_field]
+            if name not in names:
+                continue
+            shape = shape_record.shape
+            bounds = list(shape.parts) + [len(shape.points)]
+            polygons = []
+            for start, end in zip(bounds, bounds[1:]):
+                ring = [list(point) for point in shape.points[start:end]]
+                # Shapefiles list outer rings clockwise; anything else is a hole in the last polygon
+                if _signed_area(ring) < 0 or not polygons:
+                    polygons.append([ring])
+                else:
+                    polygons[-1].append(ring)
+            countries[name] = polygons
+    return countries
+
+
+def _signed_area(ring):
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])) / 2
+
+
+def build(shapefile_path, names, output=GEOMETRY_PATH):
+    countries = read_shapefile(shapefile_path, names)
+    bundle = {
+        'source': SOURCE,
+        'missing': sorted(set(names) - set(countries)),
+        'resolutions': {
+            resolution: dict(
+                feature_collection(countries, tolerance, step),
+                tolerance=tolerance,
+                step=step,
+            )
+            for resolution, (tolerance, step) in RESOLUTIONS.items()
+        },
+    }
+    Path(output).write_text(json.dumps(bundle, separators=(',', ':')))
+    return bundle
+
+
+class Boundaries:
+    def __init__(self, bundle):
+        self.source = bundle['source']
+        self.missing = tuple(bundle['missing'])
+        # Pre-serialized once so the payload size of each resolution is known up front
+        self.geojson = {}
+        self.payload_bytes = {}
+        self.vertices = {}
+        self.settings = {}
+        for resolution, collection in bundle['resolutions'].items():
+            self.settings[resolution] = (collection['tolerance'], collection['step'])
+            geojson = {'type': 'FeatureCollection', 'features': collection['features']}
+            self.geojson[resolution] = geojson
+            self.payload_bytes[resolution] = len(json.dumps(geojson, separators=(',', ':')))
+            self.vertices[resolution] = sum(_count_vertices(f['geometry']['coordinates']) for f in geojson['features'])
+
+    @property
+    def resolutions(self):
+        return list(self.geojson)
+
+
+def _count_vertices(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return 1
+    return sum(_count_vertices(part) for part in coordinates)
+
+
+@st.cache_resource
+def load_boundaries(path=GEOMETRY_PATH):
+    # One parsed copy per process, shared read-only by every session
+    return Boundaries(json.loads(Path(path).read_text()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the bundled MENA boundary geometry")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="rebuild the bundled geometry from a Natural Earth shapefile")
+    build_parser.add_argument('shapefile', help="Natural Earth admin-0 countries shapefile")
+    build_parser.add_argument('--output', default=str(GEOMETRY_PATH), help="output file")
+    subparsers.add_parser('stats', help="print vertices and payload size per resolution")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        import pandas as pd
+
+        from cleaning import DATA_PATH
+
+        names = set(pd.read_csv(Path(__file__).resolve().parent / DATA_PATH, usecols=['statename'])['statename'])
+        bundle = build(args.shapefile, names, args.output)
+        print(f"Wrote {args.output} ({Path(args.output).stat().st_size / 1024:.1f} KiB)")
+        if bundle['missing']:
+            print(f"No boundary in the source for: {', '.join(bundle['missing'])}")
+
+    boundaries = Boundaries(json.loads(Path(getattr(args, 'output', GEOMETRY_PATH)).read_text()))
+    for resolution in boundaries.resolutions:
+        tolerance, step = boundaries.settings[resolution]
+        print(f"{resolution:<9} tolerance {tolerance}°, grid {step}°: "
+              f"{boundaries.vertices[resolution]:>5} vertices, {boundaries.payload_bytes[resolution] / 1024:.1f} KiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
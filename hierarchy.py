@@ -0,0 +1,220 @@
+"""Ethnicity -> religion -> sect hierarchy built from the group labels.
+
+Group labels such as "Arab Saudi - Sunni Muslims" or "Arab Zaydi Islam" carry
+a hierarchy that the flat pie charts ignore. classify_group() recovers it
+with keyword tables, and build_hierarchy() turns the 2021 rows into one tree
+per country plus a regional tree. Every node carries its rollup metrics and
+the sunburst/treemap arrays are precomputed, so drilling into a node is a
+dictionary lookup rather than a new DataFrame filter.
+"""
+from collections import defaultdict
+
+import plotly.graph_objects as go
+import streamlit as st
+
+LEVELS = ('ethnicity', 'religion', 'sect')
+
+UNSPECIFIED = 'Unspecified'
+
+# Labels that keyword matching would get wrong: label -> (ethnicity, religion, sect)
+LABEL_OVERRIDES = {
+    'Non-Jews (Arab Muslims, Christians, Others)': ('Arab', 'Mixed', None),
+    'Other Groups (Zaghawa, Fallata, Christians, Traditional)': ('Other', 'Mixed', None),
+    'Others': ('Other', None, None),
+    'Arab Omani - Hindu/Baloch': ('Baloch/South Asian', 'Hindu/Other', None),
+}
+
+# First match wins, so more specific keywords come first
+ETHNICITY_KEYWORDS = (
+    ('arab-amazigh', 'Arab-Amazigh'),
+    ('amazigh', 'Amazigh'),
+    ('persian', 'Persian-origin'),
+    ('baloch', 'Baloch-origin'),
+    ('african-origin', 'African-origin'),
+    ('sub-saharan', 'Sub-Saharan African'),
+    ('haratin', 'Haratin'),
+    ('tuareg', 'Tuareg'),
+    ('toubou', 'Toubou'),
+    ('beja', 'Beja'),
+    ('nubian', 'Nubian'),
+    ('nuba', 'Nuba'),
+    ('fur ', 'Fur'),
+    ('sahrawi', 'Sahrawi'),
+    ('kurd', 'Kurdish'),
+    ('turkmen', 'Turkmen'),
+    ('assyrian', 'Assyrian'),
+    ('yezidi', 'Yazidi'),
+    ('armenian', 'Armenian'),
+    ('coptic', 'Copt'),
+    ('jew', 'Jewish'),
+    ('arab', 'Arab'),
+    ('palestinian', 'Arab'),
+    # Lebanese confessional groups are labelled by sect only
+    ('maronite', 'Arab'),
+    ('greek', 'Arab'),
+    ('protestant', 'Arab'),
+    ('druze', 'Arab'),
+    ('alawite', 'Arab'),
+)
+
+# keyword -> (religion, sect)
+RELIGION_KEYWORDS = (
+    ('zaydi', ('Muslim', 'Zaydi')),
+    ('ismaili', ('Muslim', 'Ismaili')),
+    ('twelver', ('Muslim', 'Shia')),
+    ('ibadi', ('Muslim', 'Ibadi')),
+    ('alawi', ('Muslim', 'Alawi')),
+    ("shi'a", ('Muslim', 'Shia')),
+    ('shia', ('Muslim', 'Shia')),
+    ('sunni', ('Muslim', 'Sunni')),
+    ('shafi', ('Muslim', 'Sunni')),
+    ('druze', ('Druze', None)),
+    ('yezidi', ('Yazidi', None)),
+    ('maronite', ('Christian', 'Maronite')),
+    ('coptic', ('Christian', 'Coptic')),
+    ('orthodox', ('Christian', 'Orthodox')),
+    ('catholic', ('Christian', 'Catholic')),
+    ('protestant', ('Christian', 'Protestant')),
+    ('assyrian', ('Christian', None)),
+    ('christian', ('Christian', None)),
+    ('jew', ('Jewish', None)),
+    ('muslim', ('Muslim', None)),
+    ('islam', ('Muslim', None)),
+)
+
+
+def _first_match(label, table):
+    for keyword, value in table:
+        if keyword in label:
+            return value
+    return None
+
+
+def classify_group(group):
+    """Split a group label into (ethnicity, religion, sect); unknown parts are None."""
+    if group in LABEL_OVERRIDES:
+        return LABEL_OVERRIDES[group]
+    label = f"{group.lower()} "
+    religion, sect = _first_match(label, RELIGION_KEYWORDS) or (None, None)
+    return _first_match(label, ETHNICITY_KEYWORDS), religion, sect
+
+
+class Node:
+    __slots__ = ('id', 'parent', 'name', 'level', 'value', 'children', 'groups', 'diversity', 'largest')
+
+    def __init__(self, node_id, parent, name, level):
+        self.id = node_id
+        self.parent = parent
+        self.name = name
+        self.level = level
+        self.value = 0.0
+        self.children = {}
+        self.groups = 0
+        self.diversity = 0.0
+        self.largest = None
+
+    def finalize(self):
+        # Rollups computed once, bottom-up
+        if not self.children:
+            self.groups = 1
+            return
+        for child in self.children.values():
+            child.finalize()
+        self.groups = sum(child.groups for child in self.children.values())
+        self.largest = max(self.children.values(), key=lambda child: child.value)
+        if self.value > 0:
+            self.diversity = 1 - sum((child.value / self.value) ** 2 for child in self.children.values())
+
+
+class Tree:
+    def __init__(self, name, leaf_level):
+        self.root = Node(name, '', name, 'root')
+        self.leaf_level = leaf_level
+        self.nodes = {name: self.root}
+        self.level_totals = {level: defaultdict(float) for level in LEVELS}
+
+    def add(self, path, leaf, value):
+        # path is (ethnicity, religion, sect); unknown levels are skipped in the
+        # tree but still counted as "Unspecified" in the level totals
+        node = self.root
+        node.value += value
+        for level, name in zip(LEVELS, path):
+            self.level_totals[level][name or UNSPECIFIED] += value
+            if name is None:
+                continue
+            node = self._child(node, name, level)
+            node.value += value
+        leaf_node = self._child(node, leaf, self.leaf_level)
+        leaf_node.value += value
+
+    def _child(self, node, name, level):
+        if name not in node.children:
+            child = Node(f"{node.id} / {name}", node.id, name, level)
+            node.children[name] = child
+            self.nodes[child.id] = child
+        return node.children[name]
+
+    def finalize(self):
+        self.root.finalize()
+        self.level_totals = {
+            level: dict(sorted(totals.items(), key=lambda item: -item[1]))
+            for level, totals in self.level_totals.items()
+        }
+        # Arrays for go.Sunburst / go.Treemap with branchvalues='total'
+        ordered = list(self.nodes.values())
+        self.ids = tuple(node.id for node in ordered)
+        self.labels = tuple(node.name for node in ordered)
+        self.parents = tuple(node.parent for node in ordered)
+        self.values = tuple(node.value for node in ordered)
+
+    def drill_options(self):
+        # Node ids below the root, in tree order, for a "drill into" selector
+        return [node_id for node_id, node in self.nodes.items() if node.children and node is not self.root]
+
+
+def hierarchy_figure(tree, kind='Sunburst', level=None, title=None):
+    # Figure straight from the precomputed arrays; ``level`` zooms into a node id
+    trace_type = go.Sunburst if kind == 'Sunburst' else go.Treemap
+    fig = go.Figure(trace_type(
+        ids=tree.ids,
+        labels=tree.labels,
+        parents=tree.parents,
+        values=tree.values,
+        branchvalues='total',
+        level=level,
+        hovertemplate='<b>%{label}</b><br>%{value:.1f}%<br>%{percentParent:.1%} of %{parent}<extra></extra>',
+    ))
+    fig.update_layout(title=title, margin=dict(t=50, l=0, r=0, b=0), height=500)
+    return fig
+
+
+class Hierarchy:
+    def __init__(self, countries, region):
+        self.countries = countries
+        self.region = region
+
+
+def hierarchy_from_frame(df, year=2021):
+    rows = df.loc[df['to'] == year, ['statename', 'group', 'percentage']]
+    n_countries = rows['statename'].nunique()
+
+    countries = {}
+    region = Tree('MENA', 'country')
+    for country, group, percentage in rows.itertuples(index=False):
+        path = classify_group(group)
+        if country not in countries:
+            countries[country] = Tree(country, 'group')
+        countries[country].add(path, group, percentage)
+        # Unweighted regional average: every country counts equally, as population totals aren't in the data
+        region.add(path, country, percentage / n_countries)
+
+    for tree in countries.values():
+        tree.finalize()
+    region.finalize()
+    return Hierarchy(countries, region)
+
+
+@st.cache_resource(max_entries=1)
+def build_hierarchy(_df, data_version):
+    # One set of trees per process for the current data version; tab1 and tab4 share it
+    return hierarchy_from_frame(_df)
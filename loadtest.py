@@ -0,0 +1,266 @@
+"""Concurrent-session load test for the MENA dashboard.
+
+Drives N headless Streamlit sessions (via ``streamlit.testing``) through
+realistic widget sequences and reports rerun latency percentiles, throughput
+and RSS growth per session. Each session runs in its own worker process, so
+script runs really overlap and compete for the CPU as they would on a server.
+
+Usage:
+    python loadtest.py --sessions 8 --steps 20
+    python loadtest.py --sessions 8 --save-baseline loadtest_baseline.json
+    python loadtest.py --sessions 8 --baseline loadtest_baseline.json --max-regression 0.25
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager, get_context
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = Path(__file__).resolve().parent / "app.py"
+
+# Queries typed into the tab2 search box, including aliases and typos
+SEARCH_QUERIES = ['', 'Amazigh', 'berber', 'UAE', 'shia', 'kurd', 'sunni arab', 'lebanon', 'amazgh', 'sunni', 'muslims', 's']
+
+# Metrics compared against a saved baseline in --baseline mode
+REGRESSION_METRICS = ['p50_ms', 'p95_ms', 'p99_ms', 'rss_per_session_mb']  # higher is worse
+CAPACITY_METRICS = ['throughput_rps']  # lower is worse
+
+# A baseline is only comparable when it was run with the same workload
+WORKLOAD_KEYS = ['sessions', 'steps']
+
+
+def current_rss_mb():
+    # /proc gives the live RSS on Linux; elsewhere fall back to the peak RSS
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def random_action(at, rng):
+    # Pick one of the interactions a real visitor would make, using the
+    # options the app currently offers so sequences stay valid as data changes
+    actions = ['country_details', 'ethnic_analysis', 'group_search', 'uncertainty_mode', 'compare_countries',
+               'map_resolution', 'conflict_selector', 'sidebar_countries']
+    action = rng.choice(actions)
+
+    if action == 'group_search':
+        at.text_input(key=action).input(rng.choice(SEARCH_QUERIES))
+    elif action in ('country_details', 'ethnic_analysis', 'conflict_selector'):
+        widget = at.selectbox(key=action)
+        widget.select(rng.choice(widget.options))
+    elif action == 'map_resolution':
+        widget = at.radio(key=action)
+        widget.set_value(rng.choice(widget.options))
+    elif action == 'uncertainty_mode':
+        widget = at.checkbox(key=action)
+        widget.set_value(not widget.value)
+    elif action == 'compare_countries':
+        widget = at.multiselect(key=action)
+        widget.set_value(rng.sample(widget.options, k=min(len(widget.options), rng.randint(1, 4))))
+    else:
+        widget = at.sidebar.multiselect[0]
+        widget.set_value(rng.sample(widget.options, k=rng.randint(1, len(widget.options))))
+    return action
+
+
+def run_session(session_id, steps, seed, timeout, trace, start_barrier):
+    # Runs in a worker process; returns the session's latencies and the worker's memory use
+    logging.disable(logging.WARNING)
+    rng = random.Random(seed + session_id)
+    latencies = []
+    errors = 0
+
+    # One throwaway run first so this worker's st.cache_data/st.cache_resource
+    # are warm and the RSS delta measures the session, not one-off loading
+    AppTest.from_file(str(APP_PATH), default_timeout=timeout).run()
+    # Collect first so cyclic garbage (plotly figures) isn't counted against the session
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    rss_before = current_rss_mb()
+    traced_before = tracemalloc.get_traced_memory()[0] if trace else 0
+
+    # Start every session at the same moment so their runs overlap
+    start_barrier.wait()
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    for step in range(steps + 1):
+        if step:
+            random_action(at, rng)
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        errors += len(at.exception)
+
+    # The AppTest is still referenced here, so its session state counts towards the RSS
+    gc.collect()
+    result = {
+        'session': session_id,
+        'latencies': latencies,
+        'errors': errors,
+        'rss_before_mb': rss_before,
+        'rss_after_mb': current_rss_mb(),
+    }
+    if trace:
+        traced_after, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['traced_mb'] = (traced_after - traced_before) / (1024 * 1024)
+        result['traced_peak_mb'] = traced_peak / (1024 * 1024)
+    return result
+
+
+def run_load_test(sessions, steps, seed=0, timeout=60, trace=False):
+    # AppTest installs a process-wide mock Runtime for the duration of each run,
+    # so two sessions cannot run concurrently in one process; every session gets
+    # its own worker process instead.
+    # Spawned (not forked) workers, so each one starts from a clean Streamlit runtime
+    context = get_context('spawn')
+    with Manager() as manager, ProcessPoolExecutor(max_workers=sessions, mp_context=context) as pool:
+        # Parties include this process, which takes the start time once every worker is warm
+        start_barrier = manager.Barrier(sessions + 1, timeout=max(timeout, 1) * 10)
+        futures = [
+            pool.submit(run_session, i, steps, seed, timeout, trace, start_barrier)
+            for i in range(sessions)
+        ]
+        start_barrier.wait()
+        wall_start = time.perf_counter()
+        results = [future.result() for future in futures]
+        wall_time = time.perf_counter() - wall_start
+
+    latencies_ms = [lat * 1000 for r in results for lat in r['latencies']]
+    report = {
+        'sessions': sessions,
+        'steps': steps,
+        'reruns': len(latencies_ms),
+        'errors': sum(r['errors'] for r in results),
+        'wall_time_s': wall_time,
+        'throughput_rps': len(latencies_ms) / wall_time if wall_time else 0.0,
+        'p50_ms': percentile(latencies_ms, 50),
+        'p95_ms': percentile(latencies_ms, 95),
+        'p99_ms': percentile(latencies_ms, 99),
+        'mean_ms': statistics.fmean(latencies_ms) if latencies_ms else 0.0,
+        'rss_before_mb': statistics.fmean(r['rss_before_mb'] for r in results),
+        'rss_after_mb': statistics.fmean(r['rss_after_mb'] for r in results),
+        'rss_per_session_mb': statistics.fmean(r['rss_after_mb'] - r['rss_before_mb'] for r in results),
+    }
+    if trace:
+        report['traced_per_session_mb'] = statistics.fmean(r['traced_mb'] for r in results)
+        report['traced_peak_mb'] = max(r['traced_peak_mb'] for r in results)
+    return report
+
+
+def compare_to_baseline(report, baseline, max_regression):
+    failures = []
+    for metric in REGRESSION_METRICS:
+        old = baseline.get(metric)
+        new = report[metric]
+        if old is None:
+            continue
+        # Small absolute floor so near-zero baselines (e.g. RSS) don't flap
+        limit = max(old * (1 + max_regression), old + 0.5)
+        if new > limit:
+            failures.append(f"{metric}: {new:.2f} > {limit:.2f} (baseline {old:.2f})")
+    for metric in CAPACITY_METRICS:
+        old = baseline.get(metric)
+        if old is None:
+            continue
+        limit = old * (1 - max_regression)
+        if report[metric] < limit:
+            failures.append(f"{metric}: {report[metric]:.2f} < {limit:.2f} (baseline {old:.2f})")
+    if report['errors'] > baseline.get('errors', 0):
+        failures.append(f"errors: {report['errors']} > {baseline.get('errors', 0)}")
+    return failures
+
+
+def print_report(report):
+    print(f"Sessions:            {report['sessions']} x {report['steps']} steps ({report['reruns']} reruns)")
+    print(f"Errors:              {report['errors']}")
+    print(f"Wall time:           {report['wall_time_s']:.2f} s")
+    print(f"Throughput:          {report['throughput_rps']:.1f} reruns/s")
+    print(f"Rerun latency p50:   {report['p50_ms']:.1f} ms")
+    print(f"Rerun latency p95:   {report['p95_ms']:.1f} ms")
+    print(f"Rerun latency p99:   {report['p99_ms']:.1f} ms")
+    print(f"Rerun latency mean:  {report['mean_ms']:.1f} ms")
+    print(f"RSS per worker:      {report['rss_before_mb']:.1f} MB -> {report['rss_after_mb']:.1f} MB (mean)")
+    print(f"RSS growth/session:  {report['rss_per_session_mb']:.2f} MB")
+    if 'traced_per_session_mb' in report:
+        print(f"Python heap/session: {report['traced_per_session_mb']:.2f} MB (tracemalloc, peak {report['traced_peak_mb']:.1f} MB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the MENA dashboard with concurrent headless sessions")
+    parser.add_argument('--sessions', type=int, default=8, help="number of concurrent sessions")
+    parser.add_argument('--steps', type=int, default=10, help="widget interactions per session")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for widget sequences")
+    parser.add_argument('--timeout', type=float, default=60, help="per-rerun timeout in seconds")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="also report Python heap retained per session (slower)")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--save-baseline', metavar='FILE', help="write the report to FILE as a baseline")
+    parser.add_argument('--baseline', metavar='FILE', help="compare against a saved baseline and fail on regressions")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="allowed relative change from the baseline: latency/RSS increase or "
+                             "throughput drop (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        mismatched = [key for key in WORKLOAD_KEYS if baseline.get(key) != getattr(args, key)]
+        if mismatched:
+            parser.error("baseline was recorded with " + ', '.join(
+                f"--{key} {baseline.get(key)}" for key in mismatched) + "; rerun with the same workload")
+
+    # Deprecation warnings are logged on every rerun and would swamp the report
+    logging.disable(logging.WARNING)
+    os.chdir(APP_PATH.parent)  # app.py reads its CSV by relative path
+
+    report = run_load_test(args.sessions, args.steps, args.seed, args.timeout, args.tracemalloc)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.save_baseline}")
+
+    if baseline is not None:
+        failures = compare_to_baseline(report, baseline, args.max_regression)
+        if failures:
+            print("REGRESSION:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Concurrent loading pipeline for the dashboard's data sources.
+
+Every source (the EPR ethnicity extract, a UCDP-style conflict extract, a
+UNHCR-style displacement extract and an optional population table) is read,
+parsed and validated on its own worker thread; pandas releases the GIL while
+parsing, so startup takes about as long as the slowest source rather than the
+sum of all of them. The results are published as one read-only DataBundle,
+versioned by the content of its source files and cached per process.
+
+Usage:
+    python pipeline.py            # load every source and report per-source timings
+    python pipeline.py --json
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+import pandas as pd
+import streamlit as st
+
+from cleaning import DATA_PATH, clean_data
+from datadiff import release_problems
+from reference_data import IMPACT_LEVELS
+
+CONFLICTS_PATH = 'conflicts_ucdp.csv'
+DISPLACEMENT_PATH = 'displacement_unhcr.csv'
+POPULATION_PATH = 'population.csv'
+
+# Columns each extract must provide; the ethnicity extract is checked by datadiff.release_problems()
+CONFLICT_COLUMNS = ['conflict_name', 'year', 'duration_days', 'location', 'type_of_conflict', 'impact',
+                    'displaced', 'casualties', 'description']
+DISPLACEMENT_COLUMNS = ['population_group', 'period', 'total_displaced', 'total_displaced_label',
+                        'countries_of_asylum']
+POPULATION_COLUMNS = ['country', 'year', 'population']
+
+
+class SourceError(ValueError):
+    """A source file is missing or fails validation."""
+
+    def __init__(self, source, problems):
+        self.source = source
+        self.problems = problems
+        super().__init__(f"{source}: " + '; '.join(problems))
+
+
+def _split_list(value):
+    # "Israel, Palestine" -> ('Israel', 'Palestine'), as in UCDP's location field
+    return tuple(part.strip() for part in value.split(',') if part.strip())
+
+
+def _check_columns(df, columns):
+    missing = [column for column in columns if column not in df.columns]
+    return [f"missing columns {missing}"] if missing else []
+
+
+def _check_nonnegative(df, columns):
+    problems = []
+    for column in columns:
+        values = pd.to_numeric(df[column], errors='coerce')
+        bad = values.isna() | (values < 0)
+        if bad.any():
+            problems.append(f"{bad.sum()} rows with a missing or negative {column}")
+    return problems
+
+
+def read_ethnicity(data):
+    df = pd.read_csv(io.BytesIO(data))
+    # Same structural checks as an uploaded release, so the comparisons below see numbers
+    problems = release_problems(df)
+    if not problems:
+        out_of_range = ~df['percentage'].between(0, 100)
+        if out_of_range.any():
+            problems.append(f"{out_of_range.sum()} rows with a percentage outside 0-100")
+        if (df['from'] > df['to']).any():
+            problems.append("periods ending before they start")
+    if problems:
+        raise SourceError('ethnicity', problems)
+    return clean_data(df)
+
+
+def read_conflicts(data):
+    df = pd.read_csv(io.BytesIO(data))
+    problems = _check_columns(df, CONFLICT_COLUMNS)
+    if not problems:
+        problems += _check_nonnegative(df, ['year', 'duration_days', 'displaced'])
+        unknown = sorted(set(df['impact'].dropna()) - set(IMPACT_LEVELS))
+        if unknown or df['impact'].isna().any():
+            problems.append(f"impact must be one of {list(IMPACT_LEVELS)} (got {unknown or 'blanks'})")
+        if df['location'].fillna('').map(_split_list).map(len).eq(0).any():
+            problems.append("conflicts without a location")
+        if df.duplicated(['conflict_name', 'year']).any():
+            problems.append("duplicate conflict_name/year rows")
+    if problems:
+        raise SourceError('conflicts', problems)
+
+    # Same shape tab5 has always used
+    conflicts_df = pd.DataFrame({
+        'year': df['year'].astype('int16'),
+        'name': df['conflict_name'],
+        'duration': df['duration_days'].astype('int32'),
+        'impact': pd.Categorical(df['impact'], categories=IMPACT_LEVELS, ordered=True),
+        'countries': df['location'].map(_split_list),
+        'displaced': df['displaced'].astype('int64'),
+        'type': df['type_of_conflict'].astype('category'),
+        'casualties': df['casualties'],
+        'description': df['description'],
+    })
+    records = tuple(
+        MappingProxyType({**record, 'year': int(record['year']), 'duration': int(record['duration'])})
+        for record in conflicts_df.astype({'impact': object, 'type': object}).to_dict('records')
+    )
+    return conflicts_df, records
+
+
+def read_displacement(data):
+    df = pd.read_csv(io.BytesIO(data))
+    problems = _check_columns(df, DISPLACEMENT_COLUMNS)
+    if not problems:
+        problems += _check_nonnegative(df, ['total_displaced'])
+        if df['population_group'].duplicated().any():
+            problems.append("duplicate population_group rows")
+    if problems:
+        raise SourceError('displacement', problems)
+
+    migration_df = pd.DataFrame({
+        'group': df['population_group'],
+        'period': df['period'],
+        'scale': df['total_displaced'].astype('int64'),
+        'scale_label': df['total_displaced_label'],
+        'primary_destinations': df['countries_of_asylum'].fillna('').map(_split_list),
+    })
+    migration_display_df = migration_df[['group', 'period', 'scale_label', 'primary_destinations']].copy()
+    migration_display_df['primary_destinations'] = migration_display_df['primary_destinations'].apply(lambda x: ', '.join(x))
+    migration_display_df = migration_display_df.rename(columns={
+        'group': 'Ethnic Group',
+        'period': 'Period',
+        'scale_label': 'Estimated Displaced',
+        'primary_destinations': 'Primary Destinations'
+    })
+    return migration_df, migration_display_df
+
+
+def read_population(data):
+    df = pd.read_csv(io.BytesIO(data))
+    problems = _check_columns(df, POPULATION_COLUMNS)
+    if not problems:
+        problems += _check_nonnegative(df, ['year', 'population'])
+        if df.duplicated(['country', 'year']).any():
+            problems.append("duplicate country/year rows")
+    if problems:
+        raise SourceError('population', problems)
+    return df[POPULATION_COLUMNS].astype({'year': 'int16', 'population': 'int64'}).sort_values(['country', 'year'])
+
+
+Source = namedtuple('Source', ['name', 'path', 'reader', 'required'])
+
+SOURCES = (
+    Source('ethnicity', DATA_PATH, read_ethnicity, True),
+    Source('conflicts', CONFLICTS_PATH, read_conflicts, True),
+    Source('displacement', DISPLACEMENT_PATH, read_displacement, True),
+    # Not shipped; drop a population table here to enable the population figures
+    Source('population', POPULATION_PATH, read_population, False),
+)
+
+DataBundle = namedtuple('DataBundle', [
+    'version', 'ethnicity', 'conflicts', 'conflict_records', 'migrations', 'migration_display',
+    'population', 'source_versions', 'timings', 'load_seconds', 'skipped', 'invalid',
+])
+
+
+def _load_source(source):
+    # Runs on a worker: read one file once, then hash, parse and validate those same bytes;
+    # returns (result, content hash, seconds)
+    start = time.perf_counter()
+    with open(source.path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    result = source.reader(data)
+    return result, digest, time.perf_counter() - start
+
+
+def load_sources(sources=SOURCES, max_workers=None):
+    """Load every source concurrently and return a DataBundle.
+
+    Raises SourceError when a required source is missing or invalid; an optional
+    source that fails is left out and reported in the bundle's ``invalid``.
+    """
+    available = [source for source in sources if source.required or os.path.exists(source.path)]
+    missing = [source.name for source in available if not os.path.exists(source.path)]
+    if missing:
+        raise SourceError(', '.join(missing), ["file not found"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or len(available)) as pool:
+        futures = {source: pool.submit(_load_source, source) for source in available}
+        # Wait for all of them so every invalid source is reported together
+        failed = {source: future.exception() for source, future in futures.items() if future.exception()}
+    load_seconds = time.perf_counter() - start
+
+    errors = []
+    invalid = {}
+    for source, error in failed.items():
+        # Parse and decode errors are ValueErrors too; anything else is a bug, not bad data
+        if not isinstance(error, ValueError):
+            raise error
+        if not isinstance(error, SourceError):
+            error = SourceError(source.name, [str(error)])
+        if source.required:
+            errors.append(error)
+        else:
+            invalid[source.name] = str(error)
+    if errors:
+        raise SourceError(', '.join(e.source for e in errors), [p for e in errors for p in e.problems])
+    results = {source.name: future.result() for source, future in futures.items() if source not in failed}
+
+    source_versions = {name: digest for name, (_, digest, _) in results.items()}
+    version = hashlib.sha256(json.dumps(source_versions, sort_keys=True).encode()).hexdigest()[:16]
+    conflicts_df, conflict_records = results['conflicts'][0]
+    migration_df, migration_display_df = results['displacement'][0]
+    return DataBundle(
+        version=version,
+        ethnicity=results['ethnicity'][0],
+        conflicts=conflicts_df,
+        conflict_records=conflict_records,
+        migrations=migration_df,
+        migration_display=migration_display_df,
+        population=results['population'][0] if 'population' in results else None,
+        source_versions=MappingProxyType(source_versions),
+        timings=MappingProxyType({name: seconds for name, (_, _, seconds) in results.items()}),
+        load_seconds=load_seconds,
+        skipped=tuple(source.name for source in sources if source not in available),
+        invalid=MappingProxyType(invalid),
+    )
+
+
+def source_fingerprint(sources=SOURCES):
+    # Cheap stat-based key: editing or adding an extract yields a new bundle without a restart
+    fingerprint = []
+    for source in sources:
+        try:
+            stat = os.stat(source.path)
+            fingerprint.append((source.path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            fingerprint.append((source.path, None, None))
+    return tuple(fingerprint)
+
+
+@st.cache_resource(max_entries=1)
+def _cached_bundle(fingerprint):
+    return load_sources()
+
+
+def load_bundle():
+    # One bundle per process, shared read-only by every session; an edited extract replaces it
+    return _cached_bundle(source_fingerprint())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load and validate every dashboard data source")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # source paths are relative to the app
+    try:
+        bundle = load_sources()
+    except SourceError as error:
+        print(f"Invalid source {error}", file=sys.stderr)
+        return 1
+
+    report = {
+        'version': bundle.version,
+        'sources': {name: {'version': bundle.source_versions[name], 'seconds': seconds}
+                    for name, seconds in bundle.timings.items()},
+        'skipped': list(bundle.skipped),
+        'invalid': dict(bundle.invalid),
+        'load_seconds': bundle.load_seconds,
+        'sequential_seconds': sum(bundle.timings.values()),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"Bundle version: {bundle.version}")
+    for name, info in report['sources'].items():
+        print(f"  {name:<13} {info['seconds'] * 1000:7.1f} ms  ({info['version']})")
+    for name in bundle.skipped:
+        print(f"  {name:<13} skipped (no file)")
+    for name, problem in bundle.invalid.items():
+        print(f"  {name:<13} skipped, invalid: {problem}")
+    print(f"Loaded in {report['load_seconds'] * 1000:.1f} ms "
+          f"(sum of sources {report['sequential_seconds'] * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
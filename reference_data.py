@@ -0,0 +1,103 @@
+"""Hard-coded reference tables for the MENA dashboard.
+
+Everything here is plain immutable data (tuples and read-only mappings) built
+once per process on import and shared by every session. The conflict and
+displacement tables are loaded from their extracts by pipeline.py.
+"""
+from types import MappingProxyType
+
+# Period assigned to every manually corrected composition below
+OVERRIDE_FROM = 2000
+OVERRIDE_TO = 2021
+
+# Manual composition corrections applied in cleaning.clean_data(): country -> ((group, percentage), ...)
+COUNTRY_OVERRIDES = MappingProxyType({
+    # Palestine - realistic percentages
+    'Palestine': (
+        ('Muslim Palestinian Arabs', 83.0),
+        ('Jewish Israeli Settlers', 15.0),
+        ('Others', 2.0),
+    ),
+    # Israel - Simplify to Jews vs Non-Jews
+    'Israel': (
+        ('Jews', 73.5),
+        ('Non-Jews (Arab Muslims, Christians, Others)', 26.5),
+    ),
+    # Tunisia - 98% Arab-Amazigh, 2% Others
+    'Tunisia': (
+        ('Muslim Arab-Amazigh - Sunni Muslims', 98.0),
+        ('Others', 2.0),
+    ),
+    # Mauritania - Add Haratin and Sub-Saharan Africans
+    'Mauritania': (
+        ('Arab-Amazigh - Sunni Muslims', 30.0),
+        ('Haratin - Sunni Muslims', 40.0),
+        ('Sub-Saharan Africans - Sunni Muslims', 30.0),
+    ),
+    # United Arab Emirates - ethnic composition of Emirati nationals only
+    # Emirati citizens have diverse ancestral backgrounds:
+    'United Arab Emirates': (
+        ('Muslim Arab Tribes (Qawasim, Bani Yas, etc.) - Sunni Muslims', 65.0),
+        ('Muslim Persian-origin Emiratis - Sunni Muslims', 20.0),
+        ('Muslim Baloch-origin Emiratis - Sunni Muslims', 8.0),
+        ('Muslim African-origin Emiratis - Sunni Muslims', 5.0),
+        ('Muslim Other Emirati groups - Sunni Muslims', 2.0),
+    ),
+    # Saudi Arabia - Citizen composition (religious sects)
+    'Saudi Arabia': (
+        ('Arab Saudi - Sunni Muslims', 85.0),
+        ('Arab Saudi - Shia Muslims', 15.0),
+    ),
+    # Qatar - Citizen composition (all Arab Qatari with religious diversity)
+    'Qatar': (
+        ('Arab Qatari - Sunni Muslims', 90.0),
+        ('Arab Qatari - Shia Muslims', 10.0),
+    ),
+    # Kuwait - Citizen composition (all Arab Kuwaiti with religious diversity)
+    'Kuwait': (
+        ('Arab Kuwaiti - Sunni Muslims', 70.0),
+        ('Arab Kuwaiti - Shia Muslims', 30.0),
+    ),
+    # Oman - Citizen composition (all Arab Omani with religious diversity)
+    'Oman': (
+        ('Arab Omani - Ibadi Muslims', 75.0),
+        ('Arab Omani - Sunni Muslims', 15.0),
+        ('Arab Omani - Shia Muslims', 5.0),
+        ('Arab Omani - Hindu/Baloch', 5.0),
+    ),
+    # Bahrain - Citizen composition (all Arab Bahraini with religious diversity)
+    'Bahrain': (
+        ('Arab Bahraini - Shia Muslims', 65.0),
+        ('Arab Bahraini - Sunni Muslims', 35.0),
+    ),
+    # Sudan - Complete overhaul
+    'Sudan': (
+        ('Sunni Muslim Arabized Sudanese', 70.0),
+        ('Beja - Sunni Muslim', 5.9),
+        ('Nuba - Sunni Muslim', 2.5),
+        ('Fur - Sunni Muslim', 2.0),
+        ('Nubians - Sunni Muslim', 1.3),
+        ('Other Groups (Zaghawa, Fallata, Christians, Traditional)', 18.3),
+    ),
+    # Yemen - Complete overhaul
+    'Yemen': (
+        ("Arab Sunni Islam (Shafi'i)", 65.0),
+        ('Arab Zaydi Islam', 34.0),
+        ('Arab Ismaili Shia Islam', 0.5),
+        ('Arab Twelver Shia Islam', 0.5),
+    ),
+})
+
+# Gulf states whose data shows citizen populations only
+GULF_COUNTRIES = ('United Arab Emirates', 'Saudi Arabia', 'Qatar', 'Kuwait', 'Oman', 'Bahrain')
+
+# Conflict impact levels, lowest to highest, and their timeline colors
+IMPACT_LEVELS = ('Low', 'Medium', 'High', 'Very High', 'Catastrophic')
+
+IMPACT_COLORS = MappingProxyType({
+    'Catastrophic': '#8B0000',
+    'Very High': '#FF0000',
+    'High': '#FF4500',
+    'Medium': '#FFA500',
+    'Low': '#FFD700'
+})
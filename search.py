@@ -0,0 +1,252 @@
+"""Fuzzy search over group and country names.
+
+The index is built once from the cleaned frame. Names are split into words;
+words are kept in a sorted vocabulary (prefix lookups are a bisect) and in a
+trigram index (typo-tolerant lookups only score words sharing a trigram with
+the query), so a lookup never scans the full list of names.
+
+Entries are numbered in the order ties are listed (shorter names first), so
+each word's posting list is already in result order. A query walks the
+postings of its rarest token best-first and stops as soon as no remaining
+entry can make the top ``limit``; words such as "sunni" or "muslims", which
+occur in most labels, cost about as much as rare ones.
+
+Usage:
+    python search.py                    # time typical queries against the current data
+    python search.py --names 20000      # ... against the labels scaled up to 20,000 names
+"""
+import argparse
+import heapq
+import re
+import sys
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import streamlit as st
+
+# Alternative spellings and names mapped onto the wording used in the data
+ALIASES = {
+    'berber': 'amazigh',
+    'berbers': 'amazigh',
+    'imazighen': 'amazigh',
+    'tamazight': 'amazigh',
+    'uae': 'united arab emirates',
+    'emirati': 'united arab emirates',
+    'ksa': 'saudi arabia',
+    'shiite': 'shia',
+    'shiites': 'shia',
+    'shii': 'shia',
+    'sunnite': 'sunni',
+    'kurdish': 'kurds',
+    'jewish': 'jews',
+    'gaza': 'palestine',
+    'west bank': 'palestine',
+}
+
+# Benchmark queries: aliases, typos, and words that occur in most EPR labels
+BENCHMARK_QUERIES = ['amazigh', 'berber', 'uae', 'amazgh', 'kurd', 'shiite', 'sunni', 'arab', 'muslims', 's',
+                     'sunni arab', 'sunni muslims']
+
+# Minimum Dice similarity between query and word trigrams for a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    # Lowercase and strip accents and punctuation ("Shafi'i" -> "shafii")
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return ' '.join(_WORD_RE.findall(text.replace("'", '')))
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def expand_aliases(query):
+    # The normalized query plus a copy with every alias replaced by its canonical wording
+    expanded = f" {query} "
+    for alias, canonical in ALIASES.items():
+        expanded = expanded.replace(f" {alias} ", f" {canonical} ")
+    expanded = expanded.strip()
+    return [query] if expanded == query else [query, expanded]
+
+
+class SearchIndex:
+    def __init__(self, names, kinds, country_groups):
+        # Entry ids follow the tie-break order of results: shorter names first, then alphabetical
+        order = sorted(range(len(names)), key=lambda i: (len(names[i]), names[i]))
+        self.names = [names[i] for i in order]
+        self.kinds = [kinds[i] for i in order]
+        self.country_groups = country_groups
+
+        word_entries = defaultdict(set)
+        for entry_id, name in enumerate(self.names):
+            for word in normalize(name).split():
+                word_entries[word].add(entry_id)
+
+        self.vocab = sorted(word_entries)
+        # Postings sorted in result order; each entry's own word ids for scoring the other tokens
+        self.word_entries = [tuple(sorted(word_entries[word])) for word in self.vocab]
+        word_ids = {word: word_id for word_id, word in enumerate(self.vocab)}
+        self.entry_words = [tuple({word_ids[word] for word in normalize(name).split()}) for name in self.names]
+        self.word_trigrams = [len(trigrams(word)) for word in self.vocab]
+
+        trigram_words = defaultdict(list)
+        for word_id, word in enumerate(self.vocab):
+            for gram in trigrams(word):
+                trigram_words[gram].append(word_id)
+        self.trigram_words = {gram: tuple(ids) for gram, ids in trigram_words.items()}
+
+    @classmethod
+    def from_frame(cls, df):
+        groups = sorted(df['group'].unique())
+        countries = sorted(df['statename'].unique())
+        country_groups = {
+            country: tuple(sorted(country_df['group'].unique()))
+            for country, country_df in df.groupby('statename')
+        }
+        return cls(groups + countries, ['group'] * len(groups) + ['country'] * len(countries), country_groups)
+
+    def _match_token(self, token):
+        # word_id -> score for one query token: exact 1.0, prefix 0.9, fuzzy up to 0.8
+        matches = {}
+
+        start = bisect_left(self.vocab, token)
+        for word_id in range(start, len(self.vocab)):
+            if not self.vocab[word_id].startswith(token):
+                break
+            matches[word_id] = 1.0 if self.vocab[word_id] == token else 0.9
+
+        if len(token) >= 3:
+            query_grams = trigrams(token)
+            shared = defaultdict(int)
+            for gram in query_grams:
+                for word_id in self.trigram_words.get(gram, ()):
+                    shared[word_id] += 1
+            for word_id, count in shared.items():
+                dice = 2 * count / (len(query_grams) + self.word_trigrams[word_id])
+                if dice >= FUZZY_THRESHOLD and word_id not in matches:
+                    matches[word_id] = 0.8 * dice
+        return matches
+
+    def _token_score(self, entry_id, matches):
+        # Best score of one query token over the entry's words, None if none of them match
+        return max((matches[word_id] for word_id in self.entry_words[entry_id] if word_id in matches), default=None)
+
+    def _search_normalized(self, query, limit, kind=None):
+        # Top ``limit`` entries as {entry_id: score}; every query token has to match some word of an entry
+        tokens = [self._match_token(token) for token in query.split()]
+        if not tokens or not all(tokens) or limit <= 0:
+            return {}
+        best_scores = [max(matches.values()) for matches in tokens]
+
+        # Drive the walk from the token matching the fewest entries; the others are membership checks
+        driver = min(range(len(tokens)), key=lambda t: sum(len(self.word_entries[w]) for w in tokens[t]))
+        levels = defaultdict(list)
+        for word_id, score in tokens[driver].items():
+            levels[score].append(word_id)
+
+        top = []  # min-heap of (score, -entry_id): the root is the worst entry kept so far
+        seen = set()
+        for level_score in sorted(levels, reverse=True):
+            # Highest total any entry of this level could reach (summed in token order, as below)
+            bound = sum(level_score if t == driver else best_scores[t] for t in range(len(tokens)))
+            if len(top) == limit and bound < top[0][0]:
+                break
+            postings = [self.word_entries[word_id] for word_id in levels[level_score]]
+            for entry_id in heapq.merge(*postings):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                if kind is not None and self.kinds[entry_id] != kind:
+                    continue
+                if len(top) == limit and (bound < top[0][0] or (bound == top[0][0] and -top[0][1] < entry_id)):
+                    break  # later entries of this level rank below everything kept
+                scores = [level_score if t == driver else self._token_score(entry_id, tokens[t])
+                          for t in range(len(tokens))]
+                if None in scores:
+                    continue
+                item = (sum(scores), -entry_id)
+                if len(top) < limit:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+        return {-neg_id: score for score, neg_id in top}
+
+    def search(self, query, limit=20, kind=None):
+        """Return up to ``limit`` (name, kind, score) tuples, best match first."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        # Each spelling's own top ``limit`` is enough: an entry's final score is its best variant's
+        scores = {}
+        for variant in expand_aliases(query):
+            for entry_id, score in self._search_normalized(variant, limit, kind).items():
+                scores[entry_id] = max(score, scores.get(entry_id, 0))
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.names[entry_id], self.kinds[entry_id], score) for entry_id, score in best]
+
+    def search_groups(self, query, limit=50):
+        # Groups matching the query directly, then the groups of matching countries
+        groups = []
+        seen = set()
+        for name, kind, _ in self.search(query, limit=limit):
+            candidates = [name] if kind == 'group' else self.country_groups.get(name, ())
+            for group in candidates:
+                if group not in seen:
+                    seen.add(group)
+                    groups.append(group)
+        return groups[:limit]
+
+
+@st.cache_resource(max_entries=1)
+def build_search_index(_df, data_version):
+    # Cached per data version (the frame itself is not hashed); only the current index is kept
+    return SearchIndex.from_frame(_df)
+
+
+def benchmark(index, queries=BENCHMARK_QUERIES, repeat=20):
+    # Mean milliseconds per search() call for each query
+    timings = {}
+    for query in queries:
+        index.search(query)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            index.search(query)
+        timings[query] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def main(argv=None):
+    import pandas as pd
+
+    from cleaning import DATA_PATH, clean_data
+
+    parser = argparse.ArgumentParser(description="Time fuzzy searches over the group and country names")
+    parser.add_argument('--names', type=int, default=0,
+                        help="scale the group labels up to this many names (numbered copies)")
+    parser.add_argument('queries', nargs='*', help="queries to time (default: a typical mix)")
+    args = parser.parse_args(argv)
+
+    df = clean_data(pd.read_csv(DATA_PATH))
+    index = SearchIndex.from_frame(df)
+    if args.names > len(index.names):
+        # Numbered copies keep the real vocabulary, so common words stay as common as in the data
+        groups = sorted(df['group'].unique())
+        names = [f"{groups[i % len(groups)]} {i // len(groups)}" for i in range(args.names)]
+        index = SearchIndex(names, ['group'] * len(names), {})
+
+    print(f"{len(index.names)} names, {len(index.vocab)} distinct words")
+    for query, ms in benchmark(index, args.queries or BENCHMARK_QUERIES).items():
+        print(f"  {query!r:<18} {ms:6.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
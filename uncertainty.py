@@ -0,0 +1,90 @@
+"""Monte Carlo uncertainty bands for the diversity index.
+
+Each country's composition is resampled from a Dirichlet distribution centred
+on the stated shares. All countries are drawn at once as one padded
+(draws x countries x groups) array of Gamma variates, in fixed-size batches
+so memory stays bounded however many draws are requested.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from reference_data import COUNTRY_OVERRIDES
+
+# Dirichlet concentration (higher = tighter around the stated shares). The
+# hand-entered overrides (Gulf citizen shares, UAE, Sudan, ...) are estimates,
+# so they get much wider bands than EPR-coded compositions.
+EPR_CONCENTRATION = 400.0
+ESTIMATE_CONCENTRATION = 60.0
+
+DRAWS = 20000
+BATCH_SIZE = 5000
+CONFIDENCE = 0.90
+
+
+def composition_matrix(df, year=2021):
+    # Countries x groups matrix of shares (0-1), zero-padded; only countries with several groups
+    rows = df.loc[df['to'] == year, ['statename', 'percentage']]
+    rows = rows[rows.groupby('statename')['statename'].transform('size') > 1]
+    countries = sorted(rows['statename'].unique())
+    position = rows.groupby('statename').cumcount().to_numpy()
+    country_index = pd.Index(countries).get_indexer(rows['statename'])
+
+    shares = np.zeros((len(countries), position.max() + 1 if len(position) else 0))
+    shares[country_index, position] = rows['percentage'].to_numpy() / 100
+    return countries, shares
+
+
+def simulate_diversity(shares, concentration, draws=DRAWS, batch_size=BATCH_SIZE, seed=0):
+    """Return a (draws x countries) array of sampled diversity indices."""
+    rng = np.random.default_rng(seed)
+    totals = shares.sum(axis=1)
+    # Dirichlet over each country's groups; padding columns have alpha 0 and always draw 0
+    alpha = shares / totals[:, None] * concentration[:, None]
+
+    results = np.empty((draws, len(shares)))
+    for start in range(0, draws, batch_size):
+        n = min(batch_size, draws - start)
+        gamma = rng.gamma(alpha, size=(n,) + alpha.shape)
+        sampled = gamma / gamma.sum(axis=2, keepdims=True) * totals[None, :, None]
+        results[start:start + n] = 1 - (sampled ** 2).sum(axis=2)
+    return results
+
+
+def rank_draws(samples):
+    # Rank 1 = most diverse, per draw
+    order = np.argsort(-samples, axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, samples.shape[1] + 1)[None, :], axis=1)
+    return ranks
+
+
+@st.cache_data
+def diversity_uncertainty(_df, data_version, draws=DRAWS, seed=0):
+    # Cached per data version (the frame itself is not hashed)
+    countries, shares = composition_matrix(_df)
+    if not countries:
+        return pd.DataFrame()
+    concentration = np.array([
+        ESTIMATE_CONCENTRATION if country in COUNTRY_OVERRIDES else EPR_CONCENTRATION
+        for country in countries
+    ])
+
+    samples = simulate_diversity(shares, concentration, draws=draws, seed=seed)
+    ranks = rank_draws(samples)
+
+    point = 1 - (shares ** 2).sum(axis=1)
+    point_rank = rank_draws(point[None, :])[0]
+    tail = (1 - CONFIDENCE) / 2
+
+    return pd.DataFrame({
+        'country': countries,
+        'diversity': point,
+        'ci_low': np.quantile(samples, tail, axis=0),
+        'ci_high': np.quantile(samples, 1 - tail, axis=0),
+        'rank': point_rank,
+        'rank_low': np.quantile(ranks, tail, axis=0, method='lower').astype(int),
+        'rank_high': np.quantile(ranks, 1 - tail, axis=0, method='higher').astype(int),
+        'rank_stability': (ranks == point_rank[None, :]).mean(axis=0),
+        'estimated': concentration == ESTIMATE_CONCENTRATION,
+    }).sort_values('rank').reset_index(drop=True)